@@ -0,0 +1,32 @@
+class SharedAnimation:
+    # one frame sequence that many sprites show in step, e.g. every water tile; it moves on once per frame, not once per sprite
+    def __init__(self, frames, speed):
+        self.frames = frames
+        # frames per second
+        self.speed = speed
+        self.frame_index = 0
+        self.index = 0
+        self.image = frames[0]
+
+    def advance(self, dt):
+        self.frame_index += self.speed * dt
+        if self.frame_index >= len(self.frames):
+            self.frame_index = 0
+        self.index = int(self.frame_index)
+        self.image = self.frames[self.index]
+
+
+class AnimationClock:
+    # every shared animation of a level, advanced together once per frame
+    def __init__(self):
+        self.animations = {}
+
+    def shared(self, name, frames, speed):
+        # sprites that ask for the same name get the same animation
+        if name not in self.animations:
+            self.animations[name] = SharedAnimation(frames, speed)
+        return self.animations[name]
+
+    def update(self, dt):
+        for animation in self.animations.values():
+            animation.advance(dt)
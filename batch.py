@@ -0,0 +1,256 @@
+# batch simulations; runs many headless farms at once on a process pool, each with its own seed, policy and settings,
+# and collects what they earned into one table
+# python batch.py --runs 32 --days 10 --policy farmer idle
+# python batch.py --days 20 --vary SALE_PRICES.corn=8,10,12 --vary GROW_SPEED.tomato=0.5,0.7
+import os
+import sys
+import csv
+import random
+import argparse
+import itertools
+from multiprocessing import Pool
+from time import perf_counter
+import numpy as np
+import pygame
+import settings
+from settings import *
+from soil import FARMABLE, PLANTED, TILLED
+from main import Game
+from benchmark import stats
+from level_data import load_level, level_cache
+
+RESULTS_PATH = '/Users/cat/Desktop/PyDewValley/batch_results.csv'
+
+CROPS = list(GROW_SPEED)
+# columns of the result table, in order
+COLUMNS = ['run', 'seed', 'policy', 'overrides', 'days', 'money', 'harvested', 'planted', 'bought', 'sold',
+           'frames', 'frame_mean', 'frame_p95', 'seconds']
+
+
+def cell_pos(x, y):
+    # middle of a cell in pixels
+    return ((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE)
+
+
+def free_cells(level):
+    # farmable cells without a plant, row by row
+    grid = level.soil_layer.grid
+    return [(int(x), int(y)) for y, x in np.argwhere((grid & FARMABLE != 0) & (grid & PLANTED == 0))]
+
+
+def harvest(level, counts):
+    soil_layer = level.soil_layer
+    for plant in list(soil_layer.harvestable_tiles.values()):
+        level.player_add(plant.plant_type)
+        soil_layer.remove_plant(plant)
+        counts['harvested'] += 1
+
+
+def sell(level, counts):
+    player = level.player
+    for item in CROPS:
+        counts['sold'] += player.item_inventory[item]
+        player.money += player.item_inventory[item] * SALE_PRICES[item]
+        player.item_inventory[item] = 0
+
+
+def buy(level, counts, cells):
+    # the cheapest seeds first, as many as there are free cells and money for
+    player = level.player
+    wanted = cells - sum(player.seed_inventory.values())
+    for seed in sorted(player.seed_inventory, key = lambda seed: PURCHASE_PRICES[seed]):
+        while wanted > 0 and player.money >= PURCHASE_PRICES[seed]:
+            player.money -= PURCHASE_PRICES[seed]
+            player.seed_inventory[seed] += 1
+            counts['bought'] += 1
+            wanted -= 1
+
+
+def plant(level, counts):
+    soil_layer = level.soil_layer
+    player = level.player
+    for x, y in free_cells(level):
+        seeds = [seed for seed, amount in player.seed_inventory.items() if amount > 0]
+        if not seeds:
+            break
+        seed = random.choice(seeds)
+        soil_layer.get_hit(cell_pos(x, y))
+        soil_layer.plant_seed(cell_pos(x, y), seed)
+        if soil_layer.grid[y, x] & PLANTED:
+            player.seed_inventory[seed] -= 1
+            counts['planted'] += 1
+
+
+def water(level, counts):
+    soil_layer = level.soil_layer
+    for y, x in np.argwhere(soil_layer.grid & TILLED):
+        soil_layer.water(cell_pos(x, y))
+
+
+def policy_idle(level, counts):
+    pass
+
+
+def policy_gardener(level, counts):
+    # only plants the seeds it already has, never goes to the shop
+    harvest(level, counts)
+    plant(level, counts)
+    water(level, counts)
+
+
+def policy_farmer(level, counts):
+    # harvests, sells every crop, spends the money on seeds for every free cell, plants and waters
+    harvest(level, counts)
+    sell(level, counts)
+    buy(level, counts, len(free_cells(level)))
+    plant(level, counts)
+    water(level, counts)
+
+
+# a policy is called once at the start of every in-game day
+POLICIES = {
+    'idle': policy_idle,
+    'gardener': policy_gardener,
+    'farmer': policy_farmer,
+}
+
+
+def parse_override(text):
+    # 'SALE_PRICES.corn=12' -> ('SALE_PRICES', 'corn', [12]); a comma separated list gives one value per run
+    name, values = text.split('=', 1)
+    table, key = name.split('.', 1)
+    if not isinstance(getattr(settings, table, None), dict) or key not in getattr(settings, table):
+        raise ValueError(f'unknown setting {name}')
+    return table, key, [number(value) for value in values.split(',')]
+
+
+def number(text):
+    # prices stay whole numbers, so money does too
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def apply_overrides(overrides):
+    # the tables are shared with every module that imported them, so they are changed in place
+    for (table, key), value in overrides.items():
+        getattr(settings, table)[key] = value
+
+
+def simulate(job):
+    # runs in a worker process; the pool gives every job a fresh process, so overrides never leak into the next run
+    run, seed, policy, overrides, days, day_frames = job
+    start = perf_counter()
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    apply_overrides(overrides)
+
+    game = Game(headless = True, render = False)
+    level = game.level
+    counts = {'harvested': 0, 'planted': 0, 'bought': 0, 'sold': 0}
+    dt = 1 / FPS
+    frame_times = []
+
+    def step():
+        frame_start = perf_counter()
+        level.run(dt)
+        frame_times.append(perf_counter() - frame_start)
+
+    for _ in range(days):
+        POLICIES[policy](level, counts)
+        for _ in range(day_frames):
+            step()
+        # go to bed; the transition calls reset when the screen is dark and wakes the player up again
+        level.player.sleep = True
+        while level.player.sleep:
+            step()
+
+    # whatever is ripe at the end counts too
+    harvest(level, counts)
+    frame = stats(np.array(frame_times))
+    return {
+        'run': run,
+        'seed': seed,
+        'policy': policy,
+        'overrides': ' '.join(f'{table}.{key}={value:g}' for (table, key), value in overrides.items()),
+        'days': days,
+        'money': level.player.money,
+        **counts,
+        'frames': len(frame_times),
+        'frame_mean': round(frame['mean'], 3),
+        'frame_p95': round(frame['p95'], 3),
+        'seconds': round(perf_counter() - start, 2),
+    }
+
+
+def compile_map():
+    # map.lvl is not checked in; compile it once here, otherwise every worker finds it missing and compiles it at the same time
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    pygame.display.init()
+    # loading converts the tiles, which needs a display
+    pygame.display.set_mode((1, 1))
+    load_level('/Users/cat/Desktop/PyDewValley/data/map.tmx')
+    # the workers load it again with their own display
+    level_cache.clear()
+    pygame.display.quit()
+
+
+def make_jobs(options):
+    fixed = {}
+    for text in options.set:
+        table, key, values = parse_override(text)
+        fixed[table, key] = values[0]
+    varied = [parse_override(text) for text in options.vary]
+
+    jobs = []
+    run = 0
+    # every combination of the varied settings, every policy, and options.runs seeds of each
+    for values in itertools.product(*[values for _, __, values in varied]):
+        overrides = dict(fixed)
+        overrides.update({(table, key): value for (table, key, _), value in zip(varied, values)})
+        for policy in options.policy:
+            for index in range(options.runs):
+                jobs.append((run, options.seed + index, policy, overrides, options.days, options.day_frames))
+                run += 1
+    return jobs
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'run many headless farms in parallel and collect the results')
+    parser.add_argument('--runs', type = int, default = 4, help = 'seeds per policy and setting combination')
+    parser.add_argument('--days', type = int, default = 7, help = 'in-game days every run lasts')
+    parser.add_argument('--day-frames', type = int, default = 600, help = 'frames the player is awake every day')
+    parser.add_argument('--policy', nargs = '+', default = ['farmer'], choices = list(POLICIES))
+    parser.add_argument('--set', action = 'append', default = [], metavar = 'TABLE.KEY=VALUE',
+                        help = 'change a setting for every run, e.g. GROW_SPEED.corn=1.5')
+    parser.add_argument('--vary', action = 'append', default = [], metavar = 'TABLE.KEY=V1,V2',
+                        help = 'run once for every value, e.g. SALE_PRICES.corn=8,10,12')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed of the first run, the others count up from it')
+    parser.add_argument('--workers', type = int, default = os.cpu_count())
+    parser.add_argument('--output', default = RESULTS_PATH)
+    options = parser.parse_args(argv)
+    try:
+        jobs = make_jobs(options)
+    except ValueError as error:
+        parser.error(str(error))
+
+    start = perf_counter()
+    compile_map()
+    results = []
+    # one process per job; every farm is its own pygame with its own settings
+    with Pool(options.workers, maxtasksperchild = 1) as pool:
+        for result in pool.imap_unordered(simulate, jobs):
+            results.append(result)
+            print(f'run {result["run"]:4} {result["policy"]:9} seed {result["seed"]:4}  money {result["money"]:6}'
+                  f'  harvested {result["harvested"]:4}  frame {result["frame_mean"]:.2f} ms  {result["overrides"]}')
+    results.sort(key = lambda result: result['run'])
+
+    with open(options.output, 'w', newline = '') as file:
+        writer = csv.DictWriter(file, COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+    print(f'{len(results)} runs in {perf_counter() - start:.1f} s on {options.workers} processes, written to {options.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# scenario benchmarks; builds a level, fills it up in different ways and times a fixed number of frames
+# python benchmark.py                    run every scenario, write the results and compare them with the baseline
+# python benchmark.py --save-baseline    run every scenario and store the results as the new baseline
+# python benchmark.py crops rain         only run some scenarios
+import sys
+import json
+import random
+import argparse
+from time import perf_counter
+import numpy as np
+from settings import *
+from main import Game
+from soil import FARMABLE
+
+BASELINE_PATH = '/Users/cat/Desktop/PyDewValley/benchmark_baseline.json'
+RESULTS_PATH = '/Users/cat/Desktop/PyDewValley/benchmark_results.json'
+
+# a scenario fails when one of these got slower than the baseline by more than the tolerance
+CHECKED_STATS = ('mean', 'p95')
+# stats that are close to zero are mostly noise, so they also have to get slower by at least this many milliseconds
+MIN_REGRESSION_MS = 0.1
+
+
+def farm_cells(level):
+    # grid x and y of every farmable cell, row by row
+    return [(int(x), int(y)) for y, x in np.argwhere(level.soil_layer.grid & FARMABLE)]
+
+
+def move_player(level, pos):
+    player = level.player
+    player.pos.update(pos)
+    player.rect.center = pos
+    player.hitbox.center = pos
+
+
+def look_at_farm(level):
+    # stand in the middle of the farm, so the camera sees what the scenario put there
+    cells = farm_cells(level)
+    x = sum(cell[0] for cell in cells) / len(cells)
+    y = sum(cell[1] for cell in cells) / len(cells)
+    move_player(level, ((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE))
+
+
+def till(level, cells):
+    for x, y in cells:
+        level.soil_layer.get_hit(((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE))
+
+
+def setup_empty(level, options):
+    pass
+
+
+def setup_crops(level, options):
+    # N crops in every stage of growth
+    soil_layer = level.soil_layer
+    cells = farm_cells(level)[:options.crops]
+    till(level, cells)
+    for x, y in cells:
+        soil_layer.plant_seed(((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE), random.choice(['corn', 'tomato']))
+    # a few days where only some of the crops got watered
+    for _ in range(4):
+        for x, y in cells:
+            if random.randint(0, 1):
+                soil_layer.water_cell(x, y)
+        soil_layer.update_plants()
+        soil_layer.remove_water()
+    look_at_farm(level)
+
+
+def setup_rain(level, options):
+    level.raining = True
+    level.soil_layer.raining = True
+    level.rain.intensity = options.rain_intensity
+    look_at_farm(level)
+
+
+def setup_fruit(level, options):
+    # an apple on every spot of every tree
+    for tree in level.tree_sprites.sprites():
+        for apple in tree.apple_sprites.sprites():
+            apple.kill()
+        while len(tree.apple_sprites) < len(tree.apple_pos):
+            tree.create_fruit()
+            # create_fruit can put two apples on the same spot, keep one per spot
+            spots = {}
+            for apple in tree.apple_sprites.sprites():
+                if apple.rect.topleft in spots:
+                    apple.kill()
+                spots[apple.rect.topleft] = apple
+    # the trees are spread over the map, so look at the one the player starts closest to
+    move_player(level, min((tree.rect.center for tree in level.tree_sprites),
+                           key = lambda pos: level.player.pos.distance_to(pos)))
+
+
+def setup_tilled(level, options):
+    # every farmable cell tilled and watered
+    till(level, farm_cells(level))
+    level.soil_layer.water_all()
+    look_at_farm(level)
+
+
+def setup_shop(level, options):
+    level.toggle_shop()
+
+
+SCENARIOS = {
+    'empty': setup_empty,
+    'crops': setup_crops,
+    'rain': setup_rain,
+    'fruit': setup_fruit,
+    'tilled': setup_tilled,
+    'shop': setup_shop,
+}
+
+
+def percentile(times, percent):
+    return float(np.percentile(times, percent)) * 1000
+
+
+def stats(times):
+    # milliseconds
+    return {
+        'mean': float(np.mean(times)) * 1000,
+        'p95': percentile(times, 95),
+        'p99': percentile(times, 99),
+    }
+
+
+def run_scenario(game, name, options):
+    level = game.level
+    SCENARIOS[name](level, options)
+
+    dt = 1 / FPS
+    for _ in range(options.warmup):
+        level.run(dt)
+
+    frame_times = np.zeros(options.frames)
+    draw_times = np.zeros(options.frames)
+    for frame in range(options.frames):
+        start = perf_counter()
+        level.run(dt)
+        frame_times[frame] = perf_counter() - start
+        draw_times[frame] = level.draw_time
+
+    return {
+        'frames': options.frames,
+        'frame': stats(frame_times),
+        'draw': stats(draw_times),
+        'update': stats(frame_times - draw_times),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # every stat that got slower than the baseline allows; empty if nothing regressed
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for part in ('frame', 'draw', 'update'):
+            for stat in CHECKED_STATS:
+                old = baseline[name][part][stat]
+                new = result[part][stat]
+                if new > old * (1 + tolerance) and new - old > MIN_REGRESSION_MS:
+                    regressions.append(f'{name} {part} {stat}: {old:.2f} ms -> {new:.2f} ms')
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'time the level in filled up scenarios')
+    parser.add_argument('scenarios', nargs = '*', help = ' '.join(SCENARIOS))
+    parser.add_argument('--frames', type = int, default = 600)
+    parser.add_argument('--warmup', type = int, default = 60)
+    parser.add_argument('--crops', type = int, default = 200, help = 'crops planted in the crops scenario')
+    parser.add_argument('--rain-intensity', type = float, default = 10, help = 'rain intensity of the rain scenario, normal rain is 1')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--tolerance', type = float, default = 0.2, help = 'how much slower than the baseline a run may be, 0.2 is 20 percent')
+    parser.add_argument('--output', default = RESULTS_PATH)
+    parser.add_argument('--baseline', default = BASELINE_PATH)
+    parser.add_argument('--save-baseline', action = 'store_true')
+    options = parser.parse_args(argv)
+    for name in options.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario {name}')
+
+    results = {}
+    for name in options.scenarios or list(SCENARIOS):
+        # same map, trees and weather every time, and a fresh level so the scenarios dont add up
+        random.seed(options.seed)
+        game = Game(headless = True)
+        results[name] = run_scenario(game, name, options)
+        # not compared with the baseline; images stay cached between scenarios, so only the first one decodes them
+        results[name]['startup'] = game.startup_time * 1000
+        frame = results[name]['frame']
+        print(f'{name:8} mean {frame["mean"]:6.2f} ms  p95 {frame["p95"]:6.2f} ms  p99 {frame["p99"]:6.2f} ms'
+              f'  (draw {results[name]["draw"]["mean"]:.2f} ms, update {results[name]["update"]["mean"]:.2f} ms)')
+
+    with open(options.output, 'w') as file:
+        json.dump(results, file, indent = 2)
+
+    if options.save_baseline:
+        with open(options.baseline, 'w') as file:
+            json.dump(results, file, indent = 2)
+        print(f'saved baseline to {options.baseline}')
+        return 0
+
+    try:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f'no baseline at {options.baseline}, run with --save-baseline first')
+        return 0
+
+    regressions = compare(results, baseline, options.tolerance)
+    for regression in regressions:
+        print('regression:', regression)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
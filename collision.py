@@ -0,0 +1,70 @@
+import pygame
+from settings import *
+
+
+class CollisionGroup(pygame.sprite.Group):
+    def __init__(self, cell_size=TILE_SIZE):
+        super().__init__()
+        # broadphase; the world is cut into cells and every sprite is filed under the cells its hitbox touches
+        self.cell_size = cell_size
+        self.cells = {}
+        # which cells each sprite was filed under, so it can be taken out again
+        self.sprite_cells = {}
+        # sprites are added to the group before they have a hitbox, so they get filed on the next lookup
+        self.pending = {}
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        self.pending[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.pending.pop(sprite, None)
+        self.unfile(sprite)
+
+    def file(self, sprite):
+        # sprites without a hitbox yet (like a plant that just got planted) are filed once refresh is called
+        if not hasattr(sprite, 'hitbox'):
+            return
+        cells = self.cells_for(sprite.hitbox)
+        for cell in cells:
+            self.cells.setdefault(cell, {})[sprite] = None
+        self.sprite_cells[sprite] = cells
+
+    def unfile(self, sprite):
+        for cell in self.sprite_cells.pop(sprite, ()):
+            del self.cells[cell][sprite]
+
+    def refresh(self, sprite):
+        # call this after the hitbox of a sprite moved or changed size
+        if sprite in self.spritedict:
+            self.pending.pop(sprite, None)
+            self.unfile(sprite)
+            self.file(sprite)
+
+    def cells_for(self, rect):
+        left = rect.left // self.cell_size
+        right = (rect.right - 1) // self.cell_size
+        top = rect.top // self.cell_size
+        bottom = (rect.bottom - 1) // self.cell_size
+        return [(x, y) for y in range(top, bottom + 1) for x in range(left, right + 1)]
+
+    def nearby(self, rect):
+        # file any new sprites first
+        for sprite in self.pending:
+            self.file(sprite)
+        self.pending.clear()
+
+        # only the sprites in the cells around rect; a dict keeps them unique and in a fixed order
+        found = {}
+        for cell in self.cells_for(rect):
+            if cell in self.cells:
+                found.update(self.cells[cell])
+        return found
+
+
+def update_hitbox(sprite):
+    # lets every collision group the sprite is in know that its hitbox changed
+    for group in sprite.groups():
+        if isinstance(group, CollisionGroup):
+            group.refresh(sprite)
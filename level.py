@@ -4,128 +4,121 @@ from settings import *
 from support import *
 from player import Player
 from overlay import Overlay
-from sprites import Generic, Water, WildFlower, Tree, Interaction, Particle
-from pytmx.util_pygame import load_pygame
+from sprites import Interaction, Particle
+from level_data import load_level
 from transition import Transition
 from soil import SoilLayer
 from sky import Rain, Sky
+from lighting import Lighting
+from animation import AnimationClock
+from streaming import World
 from random import randint
+from bisect import bisect_left
+from operator import itemgetter
 from menu import Menu
+from collision import CollisionGroup
+from timer import game_clock, ui_clock
+from time import perf_counter
+from profiler import profiler
+from sound import sound_bank
+from save import Autosaver, snapshot, restore, read_save
 
 
 
 class Level:
    
-   def __init__(self):
+   def __init__(self, render = True, save_path = None):
     # this display surface is the same as self.screen in Game class, allows level to draw straight on the main display 
     # get the display surface
       self.display_surface = pygame.display.get_surface()
+      # headless runs can skip all drawing and only update the game
+      self.render = render
+      # seconds the last frame spent drawing, the rest of run is updating; read by the benchmark
+      self.draw_time = 0
+      # dirty rect mode; the screen areas drawn this frame (None means the whole screen),
+      # and the shop state and tint the screen was last drawn with
+      self.dirty_rects = None
+      self.drawn_state = None
+      # without a save path nothing is saved, e.g. for simulations and benchmarks
+      self.autosaver = Autosaver(save_path) if save_path else None
 
     # sprite groups; groups help us draw and update any sprite in the game
       self.all_sprites = CameraGroup()
       # keep track of what player can collide w
-      self.collision_sprites = pygame.sprite.Group()
+      self.collision_sprites = CollisionGroup()
       self.tree_sprites = pygame.sprite.Group()
       self.interaction_sprites = pygame.sprite.Group()
+      # nothing scheduled by an earlier level fires in this one
+      game_clock.clear()
+      ui_clock.clear()
+      # days since the level started
+      self.day = 0
+      # animations that many sprites show in step, like the water
+      self.animation_clock = AnimationClock()
 
       self.soil_layer = SoilLayer(self.all_sprites, self.collision_sprites)
       self.setup()
       self.overlay = Overlay(self.player)
       # day to nighttime
-      self.transition = Transition(self.reset, self.player)
+      # full screen tints of the sky and the transition
+      self.lighting = Lighting()
+      self.transition = Transition(self.reset, self.player, self.lighting)
 
       # sky
       self.rain = Rain(self.all_sprites)
       self.raining = randint(0,10) > 3
       self.soil_layer.raining = self.raining
-      self.sky = Sky()
+      self.sky = Sky(self.lighting)
 
       # shop
       self.menu = Menu(self.player, self.toggle_shop)
       self.shop_active = False
 
-      # item obtained sound
-      self.success = pygame.mixer.Sound('/Users/cat/Desktop/PyDewValley/audio/success.wav')
-      self.success.set_volume(0.3)
+      # item obtained sound; more important than the tool sounds, so it always gets a channel
+      self.success = import_sound('/Users/cat/Desktop/PyDewValley/audio/success.wav', 0.3, priority = 1)
 
-      # music
-      self.music = pygame.mixer.Sound('/Users/cat/Desktop/PyDewValley/audio/music.mp3')
-      # loop plays music continously
-      self.music.play(loops = -1)
+      # music; streamed from the file, loop plays music continously
+      sound_bank.play_music('/Users/cat/Desktop/PyDewValley/audio/music.mp3', loops = -1)
 
 
    def setup(self):
-      tmx_data = load_pygame('/Users/cat/Desktop/PyDewValley/data/map.tmx')
-
-      # house floor has to come before house furniture bottom since its drawn on top of house furniture
-      for layer in ['HouseFloor', 'HouseFurnitureBottom']:
-      # build house; for loop that places each tile using x val, y val, and surf type
-         for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
-                Generic((x*TILE_SIZE, y*TILE_SIZE), surf,
-                        self.all_sprites, LAYERS['house bottom'])
-
-      # same idea as building the house floor
-      for layer in ['HouseWalls', 'HouseFurnitureTop']:
-         for x, y, surf in tmx_data.get_layer_by_name(layer).tiles():
-                Generic((x*TILE_SIZE, y*TILE_SIZE), surf, self.all_sprites)
-
-      # fence tiles
-      for x, y, surf in tmx_data.get_layer_by_name('Fence').tiles():
-         Generic((x*TILE_SIZE, y*TILE_SIZE), surf,
-                    [self.all_sprites, self.collision_sprites]) # omitted LAYERS['main'] since it shows up as default
-
-      # water; classes created inside sprite
-      water_frames = import_folder('/Users/cat/Desktop/PyDewValley/graphics/water')
-      for x, y, surf in tmx_data.get_layer_by_name('Water').tiles():
-            Water((x*TILE_SIZE, y*TILE_SIZE), water_frames, self.all_sprites)
-
-
-      # trees
-      for obj in tmx_data.get_layer_by_name('Trees'):
-            Tree(
-                pos=(obj.x, obj.y),
-                surf=obj.image,
-                groups=[self.all_sprites,
-                        self.collision_sprites, self.tree_sprites],
-                name=obj.name,
-                player_add=self.player_add)
-
-      # wildflowers
-      for obj in tmx_data.get_layer_by_name('Decoration'):
-            WildFlower((obj.x, obj.y), obj.image, [
-                       self.all_sprites, self.collision_sprites])
-
-      #collision tiles
-      for x, y, surf in tmx_data.get_layer_by_name('Collision').tiles():
-         # collision sprites is one sprite that will not exist in all sprites
-        Generic((x*TILE_SIZE, y*TILE_SIZE),
-                    pygame.Surface((TILE_SIZE, TILE_SIZE)), self.collision_sprites)
+      # compiled map; only parses map.tmx again when it changed
+      level_data = load_level('/Users/cat/Desktop/PyDewValley/data/map.tmx')
+
+      # water; every tile shows the same frame, so they all share one animation
+      water = self.animation_clock.shared('water', import_folder('/Users/cat/Desktop/PyDewValley/graphics/water'), 5)
+
+      # house, fence, water, trees, flowers, collision tiles and ground are built chunk by chunk;
+      # when streaming, only the chunks around the camera are built, and only once the player is there
+      self.world = World(self, level_data, water)
+      if STREAM_WORLD:
+         self.soil_layer.active_chunks = self.world.loaded
+      else:
+         self.world.load_all()
 
       # Player
-      for obj in tmx_data.get_layer_by_name('Player'):
-         if obj.name == 'Start':
-            self.player = Player(
-               pos = (obj.x, obj.y), 
-               group = self.all_sprites, 
-               collision_sprites = self.collision_sprites,
-               tree_sprites = self.tree_sprites,
-               interaction = self.interaction_sprites,
-               soil_layer = self.soil_layer,
-               toggle_shop = self.toggle_shop
-               )
-         # bed interaction 
-         if obj.name == 'Bed':
-             Interaction((obj.x, obj.y), (obj.width, obj.height), self.interaction_sprites, obj.name)
-         # trader interaction
-         if obj.name == 'Trader':
+      self.player = Player(
+         pos = level_data.player_start, 
+         group = self.all_sprites, 
+         collision_sprites = self.collision_sprites,
+         tree_sprites = self.tree_sprites,
+         interaction = self.interaction_sprites,
+         soil_layer = self.soil_layer,
+         toggle_shop = self.toggle_shop
+         )
+      # bed and trader interaction
+      for obj in level_data.interactions:
+         if obj.name in ('Bed', 'Trader'):
              Interaction((obj.x, obj.y), (obj.width, obj.height), self.interaction_sprites, obj.name)
-             
-      Generic(
-         pos = (0,0), 
-         surf = pygame.image.load('/Users/cat/Desktop/PyDewValley/graphics/world/ground.png').convert_alpha(), 
-         groups = self.all_sprites,
-         z = LAYERS['ground'])
-   
+
+      if STREAM_WORLD:
+         self.stream()
+
+   def stream(self):
+      # load the chunks the camera is getting close to, unload the ones it left behind
+      self.all_sprites.center_on(self.player)
+      self.world.update(self.all_sprites.view_rect())
+
    def player_add(self, item):
 
       self.player.item_inventory[item] += 1
@@ -136,19 +129,18 @@ class Level:
        self.shop_active = not self.shop_active
 
    def plant_collision(self):
-       if self.soil_layer.plant_sprites:
-           # if there are no plants, this will not trigger
-           for plant in self.soil_layer.plant_sprites.sprites():
-               if plant.harvestable and plant.rect.colliderect(self.player.hitbox):
+       if self.soil_layer.harvestable_tiles:
+           # if there are no ripe plants, this will not trigger; otherwise only the cells under the player are checked
+           for plant in self.soil_layer.harvestable_near(self.player.hitbox):
+               if plant.rect.colliderect(self.player.hitbox):
                    self.player_add(plant.plant_type)
-                   plant.kill()
+                   self.soil_layer.remove_plant(plant)
                    Particle(
                        pos = plant.rect.topleft,
                        surf = plant.image,
                        groups = self.all_sprites,
                        z = LAYERS['main']
                    )
-                   self.soil_layer.grid[plant.rect.centery // TILE_SIZE][plant.rect.centerx // TILE_SIZE].remove('P')
 
 
    def reset(self):
@@ -157,6 +149,11 @@ class Level:
 
        # soil
        self.soil_layer.remove_water()
+       if self.raining:
+           self.soil_layer.water_all()
+
+       # days go by; chunks that are not loaded catch up on them when they load again
+       self.day += 1
 
        # apples on the trees
        for tree in self.tree_sprites.sprites():
@@ -166,31 +163,132 @@ class Level:
 
        # sky
        self.sky.start_color = [255,255,255]
+
+       # the new day is saved; only copying the state happens here, writing it happens in the background
+       if self.autosaver:
+           self.autosaver.save(snapshot(self))
+
+   def load_game(self, path):
+      # returns False if there is no save or it can not be read
+      state = read_save(path)
+      if state is None:
+         return False
+      restore(self, state)
+      self.redraw()
+      return True
+
+   def dirty_areas(self, state):
+      # parts of the screen that have to be drawn again, or None for the whole screen
+      areas = self.all_sprites.changed_areas()
+      # everything changes when the camera moved, the tint changed, the shop opened or closed, or rain is falling
+      if areas is None or self.raining or self.player.sleep or state != self.drawn_state:
+         return None
+      # ui is drawn again every frame, it is small
+      areas += self.overlay.areas
+      if self.shop_active:
+         areas += self.menu.areas
+      return merge_areas(areas)
+
+   def redraw(self):
+      # the next frame is drawn completely
+      self.drawn_state = None
+
    # need delta time to make framerate independent
    def run(self, dt):
+      # game time moves with every frame instead of with the wall clock, and stands still while the shop is open;
+      # timers that are due fire here
+      ui_clock.advance(dt)
+      game_dt = 0 if self.shop_active else dt
+      game_clock.advance(game_dt)
+      draw_time = 0
+
+      if STREAM_WORLD:
+         with profiler.span('streaming'):
+            self.stream()
+
+      # daytime; before drawing, so dirty rect mode knows the tint of this frame
+      if self.render:
+         with profiler.span('sky'):
+            self.sky.display(game_dt)
+
       # so we dont accidentally see the prev frame
       # drawing logic
-      self.display_surface.fill('black')
-      self.all_sprites.custom_draw(self.player)
+      if self.render:
+         start = perf_counter()
+         with profiler.span('custom_draw'):
+            self.all_sprites.center_on(self.player)
+            self.all_sprites.sort_sprites()
+            # whether the menu is drawn and the tint; if they are not the same as last frame, everything is drawn
+            state = (self.shop_active, self.lighting.color())
+            self.dirty_rects = self.dirty_areas(state) if DIRTY_RECTS else None
+            if self.dirty_rects is None:
+               self.display_surface.fill('black')
+            self.all_sprites.custom_draw(self.player, self.dirty_rects)
+         draw_time += perf_counter() - start
+      else:
+         # nothing is drawn, but the camera still follows the player
+         self.all_sprites.center_on(self.player)
       # updates
       if self.shop_active:
-            self.menu.update()
+            # the menu is almost all drawing, so it counts as draw time
+            start = perf_counter()
+            with profiler.span('menu'):
+               self.menu.update()
+            draw_time += perf_counter() - start
       else:
-            self.all_sprites.update(dt)
-            self.plant_collision()
+            with profiler.span('update'):
+               self.animation_clock.update(dt)
+               self.all_sprites.update(dt)
+            with profiler.span('plant_collision'):
+               self.plant_collision()
       # weather
-      self.overlay.display()
+      if self.render:
+         start = perf_counter()
+         with profiler.span('overlay'):
+            self.overlay.display()
+         draw_time += perf_counter() - start
       if self.raining and not self.shop_active:
           # calls update method in rain
-          self.rain.update()
-      # daytime
-      self.sky.display(dt)
+          with profiler.span('rain'):
+             self.rain.update(dt)
       
       # transition overlay
       if self.player.sleep:
-          self.transition.play()
+          with profiler.span('transition'):
+             if self.render:
+                self.transition.play()
+             else:
+                self.transition.update()
+
+      # sky and transition darken the screen together in one pass
+      if self.render:
+         start = perf_counter()
+         with profiler.span('lighting'):
+            self.lighting.display(self.dirty_rects)
+         self.drawn_state = state
+         draw_time += perf_counter() - start
+
+      self.draw_time = draw_time
       
 
+def merge_areas(areas):
+   # areas that overlap become one, so nothing is drawn twice; None if so much changed that drawing everything is cheaper
+   screen = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+   merged = []
+   for area in areas:
+      area = screen.clip(area)
+      if not area:
+         continue
+      index = area.collidelist(merged)
+      while index != -1:
+         area.union_ip(merged.pop(index))
+         index = area.collidelist(merged)
+      merged.append(area)
+   if sum(area.width * area.height for area in merged) > DIRTY_MAX_AREA * SCREEN_WIDTH * SCREEN_HEIGHT:
+      return None
+   return merged
+
+
 class CameraGroup(pygame.sprite.Group):
    def __init__(self):
       super().__init__()
@@ -198,20 +296,161 @@ class CameraGroup(pygame.sprite.Group):
       # if player if moving right, shift entire map to the left
       self.offset = pygame.math.Vector2()
 
-   def custom_draw(self, player):
+      # render queue; every layer keeps its sprites already sorted by centery, so we dont sort the whole world each frame
+      self.layers = {layer: RenderLayer() for layer in LAYERS.values()}
+      # the (z, column, sort key) each sprite was sorted in with
+      self.sort_keys = {}
+      # counts up for every new sprite, sprites with the same centery are drawn in the order they were added
+      self.sort_count = 0
+      # sprites are added to the group before they have a rect or z, so they get sorted in on the next draw
+      self.pending = {}
+      # only sprites that can move or change layer get checked every frame (player, plants, trees)
+      self.dynamic_sprites = {}
+      # things that are not sprites (like rain) but are drawn in between the layers
+      self.layer_draws = {}
+      # dirty rect mode; image, rect and layer of every sprite on screen when it was last drawn, and the camera offset then
+      self.drawn = {}
+      self.drawn_offset = None
+
+   def add_layer_draw(self, layer, draw):
+      # draw gets called with the display surface and the camera offset right after the sprites of its layer
+      self.layer_draws.setdefault(layer, []).append(draw)
+
+   def add_internal(self, sprite, layer=None):
+      super().add_internal(sprite)
+      self.pending[sprite] = None
+
+   def remove_internal(self, sprite):
+      super().remove_internal(sprite)
+      if sprite in self.sort_keys:
+         z, column, key = self.sort_keys.pop(sprite)
+         self.layers[z].remove(column, key)
+      self.pending.pop(sprite, None)
+      self.dynamic_sprites.pop(sprite, None)
+
+   def insert_into_layer(self, sprite, order):
+      z = sprite.z
+      column = sprite.rect.left // TILE_SIZE
+      key = (sprite.rect.centery, order)
+      self.layers.setdefault(z, RenderLayer()).insert(sprite, column, key)
+      self.sort_keys[sprite] = (z, column, key)
+
+   def sort_sprites(self):
+      # new sprites
+      for sprite in self.pending:
+         self.insert_into_layer(sprite, self.sort_count)
+         self.sort_count += 1
+         if getattr(sprite, 'dynamic', False):
+            self.dynamic_sprites[sprite] = None
+      self.pending.clear()
+
+      # only re-sort the sprites that actually moved or changed layer
+      for sprite in self.dynamic_sprites:
+         z, column, key = self.sort_keys[sprite]
+         if z != sprite.z or column != sprite.rect.left // TILE_SIZE or key[0] != sprite.rect.centery:
+            self.layers[z].remove(column, key)
+            # sprite keeps its place among sprites with the same centery
+            self.insert_into_layer(sprite, key[1])
+
+   def view_rect(self):
+      # the part of the world the camera is looking at
+      return pygame.Rect(self.offset.x, self.offset.y, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+   def center_on(self, player):
       # make relative to the player; gets position of player; offset is going to be by how much we shift sprite relative to player
       self.offset.x = player.rect.centerx - SCREEN_WIDTH / 2
       self.offset.y = player.rect.centery - SCREEN_HEIGHT / 2
 
-      # cycle thru layers list, that way we get 3D effect
+   def changed_areas(self):
+      # dirty rect mode; screen areas of the sprites that moved, changed image, appeared or disappeared since the last frame
+      # None when the camera moved, then the whole screen is new anyway
+      view = self.view_rect()
+      offset = (int(self.offset.x), int(self.offset.y))
+      drawn = {}
+      for layer in self.layers.values():
+         for sprite in layer.visible(view):
+            drawn[sprite] = (sprite.image, tuple(sprite.rect), sprite.z)
+
+      areas = None
+      if offset == self.drawn_offset:
+         areas = []
+         for sprite, state in drawn.items():
+            old = self.drawn.pop(sprite, None)
+            if old != state:
+               areas.append(pygame.Rect(state[1]).move(-offset[0], -offset[1]))
+               if old:
+                  areas.append(pygame.Rect(old[1]).move(-offset[0], -offset[1]))
+         # whatever is left was on screen last frame and is gone now
+         for old in self.drawn.values():
+            areas.append(pygame.Rect(old[1]).move(-offset[0], -offset[1]))
+      self.drawn = drawn
+      self.drawn_offset = offset
+      return areas
+
+   def custom_draw(self, player, areas = None):
+      self.center_on(player)
+      self.sort_sprites()
+
+      # only sprites on screen are drawn, layer by layer and sorted by y coordinate so we get 3D effect
+      offset_x, offset_y = int(self.offset.x), int(self.offset.y)
+      if areas is None:
+         self.draw_area(self.view_rect(), offset_x, offset_y)
+      else:
+         # dirty rect mode; only the parts of the screen that changed
+         for area in areas:
+            self.display_surface.set_clip(area)
+            self.display_surface.fill('black', area)
+            self.draw_area(area.move(offset_x, offset_y), offset_x, offset_y)
+         self.display_surface.set_clip(None)
+
+   def draw_area(self, view, offset_x, offset_y):
       for layer in LAYERS.values():
-      # implementing player being shown in front or behind an object via y coordinate
-         for sprite in sorted(self.sprites(), key = lambda sprite: sprite.rect.centery):
-      # if sprite.z is same as layer, draw display surface
-            if sprite.z == layer:
-               offset_rect = sprite.rect.copy()
-               offset_rect.center -= self.offset
-               # if we are calling blit, it draws sprite in certain position
-               self.display_surface.blit(sprite.image, offset_rect)
-
-   
\ No newline at end of file
+         self.display_surface.blits(
+            [(sprite.image, (sprite.rect.x - offset_x, sprite.rect.y - offset_y)) for sprite in self.layers[layer].visible(view)],
+            doreturn = False)
+         for draw in self.layer_draws.get(layer, ()):
+            draw(self.display_surface, self.offset)
+
+
+class RenderLayer:
+   # one layer of the render queue, works like a grid: sprites are put into columns of TILE_SIZE by their left edge,
+   # and every column is sorted by centery, so the rows on screen can be cut out with bisect
+   def __init__(self):
+      self.columns = {}
+      # biggest sprite in this layer; tells us how far outside the screen a sprite can start and still be visible
+      self.max_width = 0
+      self.max_height = 0
+
+   def insert(self, sprite, column, key):
+      keys, sprites = self.columns.setdefault(column, ([], []))
+      index = bisect_left(keys, key)
+      keys.insert(index, key)
+      sprites.insert(index, sprite)
+      self.max_width = max(self.max_width, sprite.rect.width)
+      self.max_height = max(self.max_height, sprite.rect.height)
+
+   def remove(self, column, key):
+      keys, sprites = self.columns[column]
+      # keys are unique, so bisect finds the exact sprite
+      index = bisect_left(keys, key)
+      del keys[index]
+      del sprites[index]
+
+   def visible(self, view):
+      first_column = (view.left - self.max_width) // TILE_SIZE
+      last_column = view.right // TILE_SIZE
+      # a sprite is on screen vertically only if its centery is less than half its height away from the screen
+      top = (view.top - self.max_height // 2 - 1,)
+      bottom = (view.bottom + self.max_height // 2 + 1,)
+
+      found = []
+      for column in range(first_column, last_column + 1):
+         if column in self.columns:
+            keys, sprites = self.columns[column]
+            start = bisect_left(keys, top)
+            end = bisect_left(keys, bottom, start)
+            found.extend(zip(keys[start:end], sprites[start:end]))
+
+      # every column is already sorted, so this is only merging them
+      found.sort(key = itemgetter(0))
+      return [sprite for _, sprite in found if sprite.rect.colliderect(view)]
@@ -0,0 +1,398 @@
+import os
+import sys
+import mmap
+import tempfile
+import zlib
+import struct
+from array import array
+import pygame
+from settings import *
+
+# compiled levels; the tmx file is parsed with pytmx once and written out as a binary file next to it (map.tmx -> map.lvl)
+# after that the game only memory maps the binary file, pytmx is only needed again when the tmx file is newer
+LEVEL_MAGIC = b'PDLV'
+LEVEL_VERSION = 4
+# images are stored as zlib compressed RGBA pixels; map tiles are mostly flat colours and transparency, so they shrink a lot
+IMAGE_COMPRESSION = 6
+
+# umask of the process; temp files are always private, the real file gets the mode open() would have given it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# ground is one big picture; the compiler cuts it into one image per chunk, so a chunk only decodes its own piece
+GROUND_PATH = f'{GRAPHICS_PATH}/world/ground.png'
+
+# layers that get their own section in the compiled file instead of being kept as tiles or objects
+COLLISION_LAYER = 'Collision'
+FARMABLE_LAYER = 'Farmable'
+PLAYER_LAYER = 'Player'
+
+# every level that was already loaded, so the level and the soil layer can both ask for it
+level_cache = {}
+
+
+class LevelObject:
+    def __init__(self, name, x, y, width, height, image):
+        # same attributes as a pytmx object, so the level code reads the same
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.image = image
+
+
+class LevelData:
+    def __init__(self, width, height, images, tile_layers, object_layers, farmable, collision_rects, player_start, interactions,
+                 ground_chunks, buffer):
+        # size in tiles
+        self.width = width
+        self.height = height
+        self.images = images
+        # layer name -> offset in the mapped file of one image index per tile, row by row (0 means no tile, otherwise index + 1);
+        # only the rows of the chunks that load are read, the layers are never in memory as a whole
+        self.tile_layers = tile_layers
+        self.object_layers = object_layers
+        # one byte per tile, 1 if the tile is farmable
+        self.farmable = farmable
+        self.collision_rects = collision_rects
+        self.player_start = player_start
+        self.interactions = interactions
+        # chunk key -> width, height, offset and length of its compressed ground in the mapped file
+        self.ground_chunks = ground_chunks
+        # the mapped file stays open for the tiles and the ground, the pages of a chunk are only read once it is loaded
+        self.buffer = buffer
+
+    def tiles(self, layer, left, top, right, bottom):
+        # x, y and surface of every tile of a layer inside the bounds (in tiles), like pytmx layer.tiles()
+        offset = self.tile_layers.get(layer)
+        if offset is None:
+            return
+        left, right = max(left, 0), min(right, self.width)
+        for y in range(max(top, 0), min(bottom, self.height)):
+            start = offset + (y * self.width + left) * 2
+            row = array('H')
+            row.frombytes(self.buffer[start:start + max(right - left, 0) * 2])
+            if sys.byteorder == 'big':
+                row.byteswap()
+            for x, image in enumerate(row, left):
+                if image:
+                    yield x, y, self.images[image - 1]
+
+    def ground(self, key):
+        # ground of one chunk, None if the ground does not reach it
+        if key not in self.ground_chunks:
+            return None
+        width, height, offset, length = self.ground_chunks[key]
+        return unpack_image(self.buffer, offset, length, (width, height))
+
+    def objects(self, layer):
+        return self.object_layers[layer]
+
+    def farmable_tiles(self):
+        for index, farmable in enumerate(self.farmable):
+            if farmable:
+                y, x = divmod(index, self.width)
+                yield x, y
+
+
+class LevelWriter:
+    def __init__(self):
+        self.data = bytearray()
+
+    def pack(self, fmt, *values):
+        self.data += struct.pack('<' + fmt, *values)
+
+    def string(self, text):
+        encoded = (text or '').encode('utf-8')
+        self.pack('H', len(encoded))
+        self.data += encoded
+
+    def align(self, size):
+        self.data += bytes(-len(self.data) % size)
+
+
+class LevelReader:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.offset = 0
+
+    def unpack(self, fmt):
+        fmt = '<' + fmt
+        values = struct.unpack_from(fmt, self.buffer, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def string(self):
+        length, = self.unpack('H')
+        text = bytes(self.buffer[self.offset:self.offset + length]).decode('utf-8')
+        self.offset += length
+        return text
+
+    def align(self, size):
+        self.offset += -self.offset % size
+
+    def array(self, typecode, count):
+        # copy the numbers out of the mapped file, the file is closed once the level is loaded
+        values = array(typecode)
+        end = self.offset + count * values.itemsize
+        values.frombytes(self.buffer[self.offset:end])
+        if len(values) != count:
+            raise ValueError('file is cut short')
+        if sys.byteorder == 'big':
+            values.byteswap()
+        self.offset = end
+        return values
+
+
+def pack_image(image):
+    return zlib.compress(pygame.image.tobytes(image, 'RGBA'), IMAGE_COMPRESSION)
+
+
+def unpack_image(buffer, start, length, size):
+    image = pygame.image.frombytes(zlib.decompress(buffer[start:start + length]), size, 'RGBA')
+    return image.convert_alpha()
+
+
+def write_file(path, data):
+    # write next to the real file first, so a half written file is never read; every call gets its own temp file,
+    # so runners that start many processes can all write at once without writing over each other
+    file = tempfile.NamedTemporaryFile(dir = os.path.dirname(path) or '.', suffix = '.tmp', delete = False)
+    try:
+        with file:
+            file.write(data)
+        os.chmod(file.name, 0o666 & ~UMASK)
+        os.replace(file.name, path)
+    except BaseException:
+        os.remove(file.name)
+        raise
+
+
+def compiled_path(tmx_path):
+    return os.path.splitext(tmx_path)[0] + '.lvl'
+
+
+def compile_level(tmx_path, out_path=None, ground_path=GROUND_PATH):
+    # slow path; only place that needs pytmx
+    import pytmx
+    from pytmx.util_pygame import load_pygame
+
+    tmx_data = load_pygame(tmx_path)
+    width, height = tmx_data.width, tmx_data.height
+
+    # every image that is used somewhere, only stored once
+    image_indexes = {}
+    images = []
+
+    def image_index(gid):
+        if not gid:
+            return 0
+        if gid not in image_indexes:
+            images.append(tmx_data.get_tile_image_by_gid(gid))
+            image_indexes[gid] = len(images)
+        return image_indexes[gid]
+
+    tile_layers = {}
+    object_layers = {}
+    farmable = bytearray(width * height)
+    collision_rects = []
+    player_start = (0, 0)
+    interactions = []
+
+    for layer in tmx_data.layers:
+        if isinstance(layer, pytmx.TiledTileLayer):
+            if layer.name in (COLLISION_LAYER, FARMABLE_LAYER):
+                for x, y, gid in layer.iter_data():
+                    if gid and layer.name == COLLISION_LAYER:
+                        collision_rects.append((x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+                    if gid and layer.name == FARMABLE_LAYER:
+                        farmable[y * width + x] = 1
+            else:
+                data = array('H', [0]) * (width * height)
+                for x, y, gid in layer.iter_data():
+                    data[y * width + x] = image_index(gid)
+                tile_layers[layer.name] = data
+
+        elif isinstance(layer, pytmx.TiledObjectGroup):
+            if layer.name == PLAYER_LAYER:
+                for obj in layer:
+                    if obj.name == 'Start':
+                        player_start = (obj.x, obj.y)
+                    else:
+                        interactions.append((obj.name, obj.x, obj.y, obj.width, obj.height))
+            else:
+                object_layers[layer.name] = [
+                    (obj.name, obj.x, obj.y, obj.width, obj.height, image_index(obj.gid)) for obj in layer]
+
+    writer = LevelWriter()
+    writer.pack('4sHHHH', LEVEL_MAGIC, LEVEL_VERSION, width, height, TILE_SIZE)
+    # pixels are written at the end, the header points to them
+    pixels_at = len(writer.data)
+    writer.pack('I', 0)
+
+    pixels = bytearray()
+    writer.pack('H', len(images))
+    for image in images:
+        # pytmx hands out tiles without transparency as plain surfaces, so give them a real alpha channel first
+        packed = pack_image(image.convert_alpha())
+        writer.pack('HHII', image.get_width(), image.get_height(), len(pixels), len(packed))
+        pixels += packed
+
+    writer.pack('H', len(tile_layers))
+    for name, data in tile_layers.items():
+        writer.string(name)
+        writer.align(2)
+        if sys.byteorder == 'big':
+            data.byteswap()
+        writer.data += data.tobytes()
+
+    writer.pack('H', len(object_layers))
+    for name, objects in object_layers.items():
+        writer.string(name)
+        writer.pack('H', len(objects))
+        for obj_name, x, y, obj_width, obj_height, image in objects:
+            writer.string(obj_name)
+            writer.pack('ddddH', x, y, obj_width, obj_height, image)
+
+    writer.data += farmable
+
+    writer.pack('I', len(collision_rects))
+    for rect in collision_rects:
+        writer.pack('iiii', *rect)
+
+    writer.pack('dd', *player_start)
+
+    writer.pack('H', len(interactions))
+    for name, x, y, obj_width, obj_height in interactions:
+        writer.string(name)
+        writer.pack('dddd', x, y, obj_width, obj_height)
+
+    # ground, one piece per chunk; the chunk size is stored so a different CHUNK_SIZE compiles the level again
+    ground = pygame.image.load(ground_path).convert_alpha()
+    chunk_pixels = CHUNK_SIZE * TILE_SIZE
+    ground_rect = ground.get_rect()
+    pieces = []
+    for cx in range(-(-ground_rect.width // chunk_pixels)):
+        for cy in range(-(-ground_rect.height // chunk_pixels)):
+            rect = pygame.Rect(cx * chunk_pixels, cy * chunk_pixels, chunk_pixels, chunk_pixels).clip(ground_rect)
+            packed = pack_image(ground.subsurface(rect))
+            pieces.append((cx, cy, rect.width, rect.height, len(pixels), len(packed)))
+            pixels += packed
+    writer.pack('HI', CHUNK_SIZE, len(pieces))
+    for piece in pieces:
+        writer.pack('HHHHII', *piece)
+
+    writer.align(4)
+    struct.pack_into('<I', writer.data, pixels_at, len(writer.data))
+    writer.data += pixels
+
+    out_path = out_path or compiled_path(tmx_path)
+    write_file(out_path, writer.data)
+    return out_path
+
+
+def read_level(path):
+    # None if the file is not a level of this version, or is empty or cut short, so load_level compiles it again
+    try:
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+    except ValueError:
+        return None
+    try:
+        level = parse_level(buffer)
+    except (struct.error, zlib.error, ValueError, IndexError):
+        level = None
+    # the level keeps the mapping for its ground
+    if level is None:
+        buffer.close()
+    return level
+
+
+def parse_level(buffer):
+    reader = LevelReader(buffer)
+    magic, version, width, height, tile_size = reader.unpack('4sHHHH')
+    if magic != LEVEL_MAGIC or version != LEVEL_VERSION or tile_size != TILE_SIZE:
+        return None
+    pixels_offset, = reader.unpack('I')
+
+    images = []
+    image_count, = reader.unpack('H')
+    for _ in range(image_count):
+        image_width, image_height, offset, length = reader.unpack('HHII')
+        images.append(unpack_image(buffer, pixels_offset + offset, length, (image_width, image_height)))
+
+    tile_layers = {}
+    layer_count, = reader.unpack('H')
+    for _ in range(layer_count):
+        name = reader.string()
+        reader.align(2)
+        tile_layers[name] = reader.offset
+        reader.offset += width * height * 2
+        if reader.offset > len(buffer):
+            raise ValueError('file is cut short')
+
+    object_layers = {}
+    layer_count, = reader.unpack('H')
+    for _ in range(layer_count):
+        name = reader.string()
+        objects = []
+        object_count, = reader.unpack('H')
+        for _ in range(object_count):
+            obj_name = reader.string() or None
+            x, y, obj_width, obj_height, image = reader.unpack('ddddH')
+            objects.append(LevelObject(obj_name, x, y, obj_width, obj_height, images[image - 1] if image else None))
+        object_layers[name] = objects
+
+    farmable = reader.array('B', width * height)
+
+    rect_count, = reader.unpack('I')
+    collision_rects = [pygame.Rect(reader.unpack('iiii')) for _ in range(rect_count)]
+
+    player_start = reader.unpack('dd')
+
+    interactions = []
+    interaction_count, = reader.unpack('H')
+    for _ in range(interaction_count):
+        name = reader.string()
+        x, y, obj_width, obj_height = reader.unpack('dddd')
+        interactions.append(LevelObject(name, x, y, obj_width, obj_height, None))
+
+    chunk_size, piece_count = reader.unpack('HI')
+    if chunk_size != CHUNK_SIZE:
+        return None
+    ground_chunks = {}
+    for _ in range(piece_count):
+        cx, cy, piece_width, piece_height, offset, length = reader.unpack('HHHHII')
+        ground_chunks[cx, cy] = (piece_width, piece_height, pixels_offset + offset, length)
+    # a piece past the end of the file means the file is cut short
+    if any(offset + length > len(buffer) for _, __, offset, length in ground_chunks.values()):
+        raise ValueError('file is cut short')
+
+    return LevelData(width, height, images, tile_layers, object_layers, farmable, collision_rects, player_start, interactions,
+                     ground_chunks, buffer)
+
+
+def load_level(tmx_path):
+    if tmx_path in level_cache:
+        return level_cache[tmx_path]
+
+    path = compiled_path(tmx_path)
+    level = None
+    # only go back to the tmx file if it or the ground changed since the level was compiled
+    if os.path.exists(path) and os.path.getmtime(path) >= max(os.path.getmtime(tmx_path), os.path.getmtime(GROUND_PATH)):
+        level = read_level(path)
+    if level is None:
+        compile_level(tmx_path, path)
+        level = read_level(path)
+
+    level_cache[tmx_path] = level
+    return level
+
+
+# compile a level ahead of time: python level_data.py data/map.tmx
+if __name__ == '__main__':
+    pygame.init()
+    # pytmx converts tile surfaces, which needs a display
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    for tmx_path in sys.argv[1:] or ['/Users/cat/Desktop/PyDewValley/data/map.tmx']:
+        print(compile_level(tmx_path))
@@ -0,0 +1,44 @@
+import pygame
+from settings import *
+
+WHITE = (255, 255, 255)
+
+
+class Lighting:
+    # every full screen tint (the sky getting darker, the fade when sleeping) goes through here,
+    # so the screen is only multiplied once per frame, or not at all while everything is white
+    def __init__(self):
+        self.display_surface = pygame.display.get_surface()
+        self.full_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.full_color = WHITE
+        # name -> colour of that tint
+        self.tints = {}
+
+    def set_tint(self, name, color):
+        # colours are whole numbers on the surface anyway, so 254.7 and 254.2 are the same tint
+        self.tints[name] = tuple(int(value) for value in color)
+
+    def clear_tint(self, name):
+        self.tints.pop(name, None)
+
+    def color(self):
+        # multiplying by both tints one after the other is the same as multiplying by their product once
+        color = WHITE
+        for tint in self.tints.values():
+            color = tuple((a * b + 255) >> 8 for a, b in zip(color, tint))
+        return color
+
+    def display(self, areas = None):
+        color = self.color()
+        if color == WHITE:
+            return
+        # the surface only has to be filled again when the colour changed
+        if color != self.full_color:
+            self.full_surf.fill(color)
+            self.full_color = color
+        if areas is None:
+            self.display_surface.blit(self.full_surf, (0, 0), special_flags = pygame.BLEND_RGBA_MULT)
+        else:
+            # dirty rect mode; the rest of the screen still has the tint from an earlier frame
+            for area in areas:
+                self.display_surface.blit(self.full_surf, area, area, special_flags = pygame.BLEND_RGBA_MULT)
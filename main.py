@@ -1,17 +1,67 @@
 # pygame we are importing, sys we need to run the game properly
 import pygame
+import os
 import sys
 import time
+from time import perf_counter
 from settings import *
+from support import image_files, preload_images
 from level import Level
+from profiler import profiler
 
 class Game:
-    def __init__(self):
-        pygame.init()
+    def __init__(self, headless = False, render = True):
+        start = perf_counter()
+        # headless runs without a window or sound card, e.g. for simulations and performance tests on a server
+        self.headless = headless
+        if headless:
+            # sdl still needs a display to convert images, the dummy drivers give it one that goes nowhere
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+            # no mixer, so every sound is a silent null sound
+            pygame.display.init()
+            pygame.font.init()
+        else:
+            pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption(WINDOW_TITLE)
         self.clock = pygame.time.Clock()
-        self.level = Level()
+
+        # every image the game uses is decoded before the level is built, the level then takes them straight from the cache
+        self.loading_shown = -1
+        paths = [path for folder in PRELOAD_FOLDERS for path in image_files(f'{GRAPHICS_PATH}/{folder}')]
+        preload_images(paths, None if headless else self.draw_loading, LOADING_WORKERS)
+        # headless runs never touch the save file
+        self.level = Level(render, save_path = None if headless else SAVE_PATH)
+        if not headless:
+            self.level.load_game(SAVE_PATH)
+        # seconds from starting pygame to the first frame being ready
+        self.startup_time = perf_counter() - start
+
+    def draw_loading(self, done, total):
+        # loading screen; a bar that fills up while the images come in, only drawn again when it grew by a percent
+        shown = done * 100 // total
+        if shown == self.loading_shown:
+            return
+        self.loading_shown = shown
+        # keeps the window from looking frozen
+        pygame.event.pump()
+        self.screen.fill('black')
+        bar = pygame.Rect(0, 0, SCREEN_WIDTH // 2, 24)
+        bar.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+        pygame.draw.rect(self.screen, 'white', bar, 2)
+        filled = bar.inflate(-8, -8)
+        filled.width = filled.width * done // total
+        pygame.draw.rect(self.screen, 'white', filled)
+        pygame.display.update()
+
+    # steps the game with a fixed dt as fast as the cpu allows, instead of waiting for the next frame
+    def simulate(self, frames, dt = 1 / FPS):
+        for _ in range(frames):
+            pygame.event.pump()
+            profiler.begin_frame()
+            self.level.run(dt)
+            profiler.end_frame()
 
 # most of the game will run inside the run method
     def run(self):
@@ -20,15 +70,36 @@ class Game:
             # checking if we are closing game
              for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    # the last autosave has to be on disk before the game closes
+                    if self.level.autosaver:
+                        error = self.level.autosaver.wait()
+                        if error:
+                            print(f'could not save the game: {error}')
                     pygame.quit()
                     sys.exit()
+                # F3 turns the profiler and its frame time graph on and off, F4 writes the recorded frames to disk
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                    # the graph covers part of the screen, or stops covering it
+                    self.level.redraw()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    print('profile written to', *profiler.dump())
 
              dt = self.clock.tick(FPS) / 1000
+             profiler.begin_frame()
             # always calling run method in level
              self.level.run(dt)
-             pygame.display.update()
+             graph = profiler.draw_graph(self.screen)
+             with profiler.span('display_update'):
+                if self.level.dirty_rects is None:
+                    pygame.display.update()
+                else:
+                    # only the parts of the screen that were drawn again
+                    pygame.display.update(self.level.dirty_rects + ([graph] if graph else []))
+             profiler.end_frame()
 
 # checking if this is the main file, then creating an obj, then creating run method
 if __name__ == '__main__':
     game = Game()
+    print(f'started in {game.startup_time:.2f} s')
     game.run()
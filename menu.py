@@ -1,6 +1,7 @@
 import pygame
 from settings import *
-from timer import Timer
+from timer import Timer, ui_clock
+from ui import TextCache, Panel
 
 
 class Menu:
@@ -10,6 +11,8 @@ class Menu:
         self.toggle_menu = toggle_menu
         self.display_surface = pygame.display.get_surface()
         self.font = pygame.font.Font('/Users/cat/Desktop/PyDewValley/font/LycheeSoda.ttf', 30)
+        # amounts and money are only rendered the first time that string shows up
+        self.text_cache = TextCache(self.font, 'Black')
 
         # options
         self.width = 400
@@ -24,17 +27,18 @@ class Menu:
         # checking index of inventory
         # movement
         self.index = 0
-        self.timer = Timer(200)
+        # game time stops while the shop is open, so the key repeat runs on ui time
+        self.timer = Timer(200, clock = ui_clock)
 
-    def display_money(self):
-        text_surf = self.font.render(f'${self.player.money}', False, 'Black')
+    def draw_money(self, surface, money):
+        text_surf = self.text_cache.render(f'${money}')
         text_rect = text_surf.get_rect(
-            midbottom=(SCREEN_WIDTH/2, SCREEN_HEIGHT-20))
+            midbottom=(SCREEN_WIDTH/2 - self.panel.rect.left, SCREEN_HEIGHT-20 - self.panel.rect.top))
         
         # adding background for text
-        pygame.draw.rect(self.display_surface, 'White',
+        pygame.draw.rect(surface, 'White',
                          text_rect.inflate(10, 10), 0, 4)
-        self.display_surface.blit(text_surf, text_rect)
+        surface.blit(text_surf, text_rect)
 
     def setup(self):
         # create text surfaces
@@ -51,6 +55,14 @@ class Menu:
         self.menu_top = SCREEN_HEIGHT / 2 - self.total_height / 2
         self.main_rect = pygame.Rect(
             SCREEN_WIDTH / 2 - self.width / 2, self.menu_top, self.width, self.total_height)
+        # every part of the screen the menu draws on, for dirty rect mode; the money is drawn somewhere in the bottom band
+        self.areas = [self.main_rect, pygame.Rect(0, 0, self.width, 60)]
+        self.areas[1].midbottom = (SCREEN_WIDTH / 2, SCREEN_HEIGHT - 10)
+        # the whole menu is one panel, drawn again only when an amount, the money or the selection changed
+        self.panel = Panel(self.main_rect.union(self.areas[1]), self.draw)
+        # top of every entry relative to the panel; every entry is the distance of one entry plus space below the one before
+        self.entry_tops = [self.main_rect.top - self.panel.rect.top + index * (text_surf.get_height() + self.padding * 2 + self.space)
+                           for index, text_surf in enumerate(self.text_surfs)]
 
         # buy / sell surface
         self.buy_text = self.font.render('buy', False, 'Black')
@@ -58,7 +70,6 @@ class Menu:
 
     def input(self):
         keys = pygame.key.get_pressed()
-        self.timer.update()
 
         if keys[pygame.K_ESCAPE]:
             self.toggle_menu()
@@ -96,44 +107,46 @@ class Menu:
         if self.index > len(self.options) - 1:
             self.index = 0
 
-    def show_entry(self, text_surf, amount, top, selected):
+    def show_entry(self, surface, text_surf, amount, top, selected):
+        left = self.main_rect.left - self.panel.rect.left
+        right = left + self.width
         # background
-        bg_rect = pygame.Rect(self.main_rect.left, top, self.width,
+        bg_rect = pygame.Rect(left, top, self.width,
                               text_surf.get_height() + self.padding * 2)
-        pygame.draw.rect(self.display_surface, 'White', bg_rect, 0, 4)
+        pygame.draw.rect(surface, 'White', bg_rect, 0, 4)
 
         # text
         text_rect = text_surf.get_rect(
-            midleft=(self.main_rect.left+20, bg_rect.centery))
-        self.display_surface.blit(text_surf, text_rect)
+            midleft=(left+20, bg_rect.centery))
+        surface.blit(text_surf, text_rect)
 
         # amount
-        amount_surf = self.font.render(str(amount), False, 'Black')
+        amount_surf = self.text_cache.render(str(amount))
         amount_rect = amount_surf.get_rect(
-            midright=(self.main_rect.right-20, bg_rect.centery))
-        self.display_surface.blit(amount_surf, amount_rect)
+            midright=(right-20, bg_rect.centery))
+        surface.blit(amount_surf, amount_rect)
 
         # show specific entry ONLY if selected
         if selected:
-            pygame.draw.rect(self.display_surface, 'black', bg_rect, 4, 4)
+            pygame.draw.rect(surface, 'black', bg_rect, 4, 4)
             if self.index <= self.sell_border:  # buy
                 buy_pos_rect = self.sell_text.get_rect(
-                    midleft=(self.main_rect.left + 150, bg_rect.centery))
-                self.display_surface.blit(self.sell_text, buy_pos_rect)
+                    midleft=(left + 150, bg_rect.centery))
+                surface.blit(self.sell_text, buy_pos_rect)
             else:  # sell
                 sell_pos_rect = self.buy_text.get_rect(
-                    midleft=(self.main_rect.left + 150, bg_rect.centery))
-                self.display_surface.blit(self.buy_text, sell_pos_rect)
+                    midleft=(left + 150, bg_rect.centery))
+                surface.blit(self.buy_text, sell_pos_rect)
 
-    def update(self):
-        self.input()
-        self.display_money()
+    def draw(self, surface, state):
+        amounts, money, index = state
+        self.draw_money(surface, money)
 
         for text_index, text_surf in enumerate(self.text_surfs):
-            # by default, we are getting the top of rectangle, for every item we want to get the distance from text index
-            top = self.main_rect.top + text_index * \
-                (text_surf.get_height() + (self.padding * 2) + self.space)
-            amount_list = list(self.player.item_inventory.values()) + \
-                list(self.player.seed_inventory.values())
-            amount = amount_list[text_index]
-            self.show_entry(text_surf, amount, top, self.index == text_index)
\ No newline at end of file
+            self.show_entry(surface, text_surf, amounts[text_index], self.entry_tops[text_index], index == text_index)
+
+    def update(self):
+        self.input()
+        # amounts in the same order as the options; built once per frame, not once per entry
+        amounts = tuple(self.player.item_inventory.values()) + tuple(self.player.seed_inventory.values())
+        self.panel.display(self.display_surface, (amounts, self.player.money, self.index))
@@ -1,5 +1,7 @@
 import pygame
 from settings import *
+from support import import_image
+from ui import Panel
 
 class Overlay:
     def __init__(self, player):
@@ -10,17 +12,24 @@ class Overlay:
 
         # imports
         overlay_path = '/Users/cat/Desktop/PyDewValley/graphics/overlay/'
-        self.tools_surf = {tool: pygame.image.load(f'{overlay_path}{tool}.png').convert_alpha() for tool in player.tools}
-        self.seeds_surf = {seed: pygame.image.load(f'{overlay_path}{seed}.png').convert_alpha() for seed in player.seeds}
-       
-    def display(self):
+        self.tools_surf = {tool: import_image(f'{overlay_path}{tool}.png') for tool in player.tools}
+        self.seeds_surf = {seed: import_image(f'{overlay_path}{seed}.png') for seed in player.seeds}
 
-        # tools; selected tool could either be hoe water or axe
-        tool_surf = self.tools_surf[self.player.selected_tool]
-        tool_rect = tool_surf.get_rect(midbottom = OVERLAY_POSITIONS['tool'])
-        self.display_surface.blit(tool_surf,tool_rect)
+        # the icons are drawn into one panel that covers every place an icon can be, and only when the selection changed
+        self.tool_rects = {tool: surf.get_rect(midbottom = OVERLAY_POSITIONS['tool']) for tool, surf in self.tools_surf.items()}
+        self.seed_rects = {seed: surf.get_rect(midbottom = OVERLAY_POSITIONS['seed']) for seed, surf in self.seeds_surf.items()}
+        rects = list(self.tool_rects.values()) + list(self.seed_rects.values())
+        self.panel = Panel(rects[0].unionall(rects[1:]), self.draw)
+        # the part of the screen the overlay draws on, for dirty rect mode
+        self.areas = [self.panel.rect]
 
+    def draw(self, surface, state):
+        tool, seed = state
+        left, top = self.panel.rect.topleft
+        # tools; selected tool could either be hoe water or axe
+        surface.blit(self.tools_surf[tool], self.tool_rects[tool].move(-left, -top))
         # seeds
-        seed_surf = self.seeds_surf[self.player.selected_seed]
-        seed_rect = seed_surf.get_rect(midbottom = OVERLAY_POSITIONS['seed'])
-        self.display_surface.blit(seed_surf,seed_rect)
\ No newline at end of file
+        surface.blit(self.seeds_surf[seed], self.seed_rects[seed].move(-left, -top))
+
+    def display(self):
+        self.panel.display(self.display_surface, (self.player.selected_tool, self.player.selected_seed))
@@ -20,6 +20,8 @@ class Player(pygame.sprite.Sprite):
         self.rect = self.image.get_rect(center = pos)
         # player has z position; x and y always come from rectangle feature
         self.z = LAYERS['main']
+        # player moves every frame, so the camera has to keep re-sorting it
+        self.dynamic = True
 
         # movement attributes
         self.direction = pygame.math.Vector2(0, 0)
@@ -74,8 +76,7 @@ class Player(pygame.sprite.Sprite):
         self.toggle_shop = toggle_shop
 
         # watering sound
-        self.watering = pygame.mixer.Sound('/Users/cat/Desktop/PyDewValley/audio/water.mp3')
-        self.watering.set_volume(0.2)
+        self.watering = import_sound('/Users/cat/Desktop/PyDewValley/audio/water.mp3', 0.2)
 
     def use_tool(self):
         if self.selected_tool == 'hoe':
@@ -198,10 +199,6 @@ class Player(pygame.sprite.Sprite):
     
     # method that assigns idle animation to when player isn't moving
 
-    def update_timers(self):
-        for timer in self.timers.values():
-            timer.update()
-
     def get_status(self):
         # idle
         if self.direction.magnitude() == 0:
@@ -213,29 +210,27 @@ class Player(pygame.sprite.Sprite):
             self.status = self.status.split('_')[0] + '_' + self.selected_tool
     
     def collision(self, direction):
-        # looks @ every sprite inside of collision sprites
-        for sprite in self.collision_sprites.sprites():
-            # if sprite has attribute named hitbox
-             if hasattr(sprite, 'hitbox'):
-                if sprite.hitbox.colliderect(self.hitbox):
-                    # check if collision happens on left or right; if collison happens to right, player has to be to the left of obs
-                    if direction == 'horizontal':
-                        if self.direction.x > 0: # moving right
-                            self.hitbox.right = sprite.hitbox.left
-                        if self.direction.x < 0: # moving left
-                            self.hitbox.left = sprite.hitbox.right
-                        # rectangle player sees
-                        self.rect.centerx = self.hitbox.centerx
-                        self.pos.x = self.hitbox.centerx
-                # check if collision happens up or down
-                    if direction == 'vertical':
-                        if self.direction.y > 0: # moving down
-                            self.hitbox.bottom = sprite.hitbox.top
-                        if self.direction.y < 0: # moving up
-                            self.hitbox.top = sprite.hitbox.bottom
-                        # rectangle player sees
-                        self.rect.centery = self.hitbox.centery
-                        self.pos.y = self.hitbox.centery
+        # only looks @ the collision sprites close to the player; all of them have a hitbox
+        for sprite in self.collision_sprites.nearby(self.hitbox):
+            if sprite.hitbox.colliderect(self.hitbox):
+                # check if collision happens on left or right; if collison happens to right, player has to be to the left of obs
+                if direction == 'horizontal':
+                    if self.direction.x > 0: # moving right
+                        self.hitbox.right = sprite.hitbox.left
+                    if self.direction.x < 0: # moving left
+                        self.hitbox.left = sprite.hitbox.right
+                    # rectangle player sees
+                    self.rect.centerx = self.hitbox.centerx
+                    self.pos.x = self.hitbox.centerx
+            # check if collision happens up or down
+                if direction == 'vertical':
+                    if self.direction.y > 0: # moving down
+                        self.hitbox.bottom = sprite.hitbox.top
+                    if self.direction.y < 0: # moving up
+                        self.hitbox.top = sprite.hitbox.bottom
+                    # rectangle player sees
+                    self.rect.centery = self.hitbox.centery
+                    self.pos.y = self.hitbox.centery
 
 
     def move(self, dt):
@@ -261,7 +256,7 @@ class Player(pygame.sprite.Sprite):
     def update(self, dt):
         self.input()
         self.get_status()
-        self.update_timers()
+        # timers fire by themselves from the game clock
         self.get_target_pos()
 
         self.move(dt)
@@ -0,0 +1,167 @@
+import sys
+import csv
+import json
+import threading
+import traceback
+from time import perf_counter, sleep
+from collections import deque
+import pygame
+from settings import *
+
+# where F4 writes the last frames to; the json file opens in chrome://tracing or ui.perfetto.dev
+TRACE_PATH = '/Users/cat/Desktop/PyDewValley/profile_trace.json'
+CSV_PATH = '/Users/cat/Desktop/PyDewValley/profile_spans.csv'
+
+
+class Span:
+    # times one part of a frame: with profiler.span('rain'): ...
+    def __init__(self, spans, name):
+        self.spans = spans
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc):
+        self.spans.append((self.name, self.start, perf_counter()))
+
+
+class NullSpan:
+    # what span hands out while the profiler is off, so the game pays almost nothing for it
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+null_span = NullSpan()
+
+
+class Profiler:
+    def __init__(self, capacity = 600, budget = 1 / FPS):
+        self.enabled = False
+        self.show_graph = False
+        # a frame that takes longer than this (in seconds) is a hitch
+        self.budget = budget
+
+        # ring buffers; the oldest frames fall out once they are full
+        # every frame is (index, start, end, spans) and every span is (name, start, end)
+        self.frames = deque(maxlen = capacity)
+        self.hitches = deque(maxlen = 32)
+
+        # frame that is running right now
+        self.frame_index = 0
+        self.frame_start = None
+        self.spans = []
+
+        # the watchdog thread samples the stack of the game loop while a frame runs over budget
+        self.main_thread_id = threading.get_ident()
+        self.watchdog = None
+        self.stack_samples = {}
+
+        self.font = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.show_graph = self.enabled
+        self.frames.clear()
+        if self.enabled and not self.watchdog:
+            self.main_thread_id = threading.get_ident()
+            self.watchdog = threading.Thread(target = self.watch, daemon = True)
+            self.watchdog.start()
+
+    def span(self, name):
+        if self.enabled and self.frame_start is not None:
+            return Span(self.spans, name)
+        return null_span
+
+    def begin_frame(self):
+        if self.enabled:
+            self.spans = []
+            self.frame_start = perf_counter()
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        end = perf_counter()
+        start = self.frame_start
+        self.frame_start = None
+        frame = (self.frame_index, start, end, self.spans)
+        self.frames.append(frame)
+
+        # keep everything about a frame that went over budget, including where the watchdog caught it
+        stack = self.stack_samples.pop(self.frame_index, None)
+        if end - start > self.budget:
+            self.hitches.append({'frame': frame, 'stack': stack})
+        self.stack_samples.clear()
+        self.frame_index += 1
+
+    def watch(self):
+        # runs on its own thread; checks a few times per frame if the current frame is over budget
+        while self.enabled:
+            sleep(self.budget / 4)
+            start, index = self.frame_start, self.frame_index
+            if start is None or index in self.stack_samples or perf_counter() - start <= self.budget:
+                continue
+            python_frame = sys._current_frames().get(self.main_thread_id)
+            if python_frame:
+                self.stack_samples[index] = traceback.format_stack(python_frame)
+        self.watchdog = None
+
+    def draw_graph(self, surface):
+        # returns the part of the screen the graph covers
+        if not self.show_graph:
+            return None
+        # one bar per frame, budget line in the middle, newest frame on the right
+        width, height = 240, 80
+        rect = pygame.Rect(SCREEN_WIDTH - width - 10, 10, width, height)
+        pygame.draw.rect(surface, 'black', rect)
+        scale = height / (self.budget * 2)
+        frames = list(self.frames)[-width:]
+        for x, (index, start, end, spans) in enumerate(frames):
+            bar = min(height, int((end - start) * scale))
+            color = 'red' if end - start > self.budget else 'green'
+            left = rect.right - len(frames) + x
+            pygame.draw.line(surface, color, (left, rect.bottom), (left, rect.bottom - bar))
+        pygame.draw.line(surface, 'white', (rect.left, rect.bottom - height // 2), (rect.right, rect.bottom - height // 2))
+
+        if frames:
+            if not self.font:
+                self.font = pygame.font.Font('/Users/cat/Desktop/PyDewValley/font/LycheeSoda.ttf', 20)
+            last = frames[-1]
+            text = f'{(last[2] - last[1]) * 1000:.1f} ms  hitches {len(self.hitches)}'
+            surface.blit(self.font.render(text, False, 'white'), (rect.left + 4, rect.top + 2))
+        return rect
+
+    def trace_events(self):
+        # chrome trace format; times are in microseconds
+        events = []
+        for index, start, end, spans in self.frames:
+            events.append({'name': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0,
+                           'ts': start * 1e6, 'dur': (end - start) * 1e6, 'args': {'frame': index}})
+            for name, span_start, span_end in spans:
+                events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                               'ts': span_start * 1e6, 'dur': (span_end - span_start) * 1e6})
+        for hitch in self.hitches:
+            index, start, end, spans = hitch['frame']
+            events.append({'name': 'hitch', 'ph': 'i', 's': 't', 'pid': 0, 'tid': 0, 'ts': end * 1e6,
+                           'args': {'frame': index, 'ms': (end - start) * 1000, 'stack': ''.join(hitch['stack'] or [])}})
+        return events
+
+    def dump(self, trace_path = TRACE_PATH, csv_path = CSV_PATH):
+        with open(trace_path, 'w') as file:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, file)
+
+        # one row per span, times in milliseconds from the start of its frame
+        with open(csv_path, 'w', newline = '') as file:
+            writer = csv.writer(file)
+            writer.writerow(['frame', 'span', 'start_ms', 'duration_ms', 'frame_ms'])
+            for index, start, end, spans in self.frames:
+                writer.writerow([index, 'frame', 0, (end - start) * 1000, (end - start) * 1000])
+                for name, span_start, span_end in spans:
+                    writer.writerow([index, name, (span_start - start) * 1000, (span_end - span_start) * 1000, (end - start) * 1000])
+        return trace_path, csv_path
+
+
+profiler = Profiler()
@@ -0,0 +1,217 @@
+import os
+import zlib
+import struct
+import threading
+from time import perf_counter
+import numpy as np
+from level_data import LevelWriter, LevelReader, write_file
+
+# save files; a small header and one zlib compressed block with the whole farm in it
+# the level is copied into a GameState on the main thread, which is only a few array copies,
+# packing and compressing that copy is left to a background thread
+SAVE_MAGIC = b'PDSV'
+SAVE_VERSION = 1
+# fastest zlib level; the farm is mostly one byte per cell, so it still gets small
+SAVE_COMPRESSION = 1
+
+
+class GameState:
+    # everything that has to survive a restart, copied out of the level so it can be saved while the game keeps running
+    def __init__(self, money, item_inventory, seed_inventory, player_pos, raining, sky_color, grid, crops, trees):
+        self.money = money
+        self.item_inventory = item_inventory
+        self.seed_inventory = seed_inventory
+        self.player_pos = player_pos
+        self.raining = raining
+        self.sky_color = sky_color
+        # soil grid, one byte of flags per cell
+        self.grid = grid
+        # plant type name -> (ages, grid x and y of every crop of that type)
+        self.crops = crops
+        # left and bottom of a tree (before it turned into a stump) -> (health, positions of its apples)
+        self.trees = trees
+
+
+def snapshot(level):
+    player = level.player
+    # crops of chunks that are not loaded are saved at the age they have today
+    level.soil_layer.catch_up_all()
+    crops = level.soil_layer.crops
+    alive = np.flatnonzero(crops.alive)
+    crop_state = {}
+    for type_index, plant_type in enumerate(crops.plant_types):
+        index = alive[crops.plant_type[alive] == type_index]
+        crop_state[plant_type] = (crops.age[index].copy(), crops.tile[index].astype(np.int32))
+
+    return GameState(
+        money = player.money,
+        item_inventory = dict(player.item_inventory),
+        seed_inventory = dict(player.seed_inventory),
+        player_pos = tuple(player.pos),
+        raining = level.raining,
+        sky_color = tuple(level.sky.start_color),
+        grid = level.soil_layer.grid.copy(),
+        crops = crop_state,
+        trees = level.world.tree_states())
+
+
+def restore(level, state):
+    player = level.player
+    player.money = state.money
+    # only items the game still knows about; an old save might have items that were removed since
+    for inventory, saved in ((player.item_inventory, state.item_inventory), (player.seed_inventory, state.seed_inventory)):
+        for item, amount in saved.items():
+            if item in inventory:
+                inventory[item] = amount
+    player.pos.update(state.player_pos)
+    player.hitbox.center = (round(player.pos.x), round(player.pos.y))
+    player.rect.center = player.hitbox.center
+
+    level.raining = state.raining
+    level.soil_layer.raining = state.raining
+    level.sky.start_color = list(state.sky_color)
+    level.soil_layer.restore(state.grid, state.crops)
+
+    # trees are found by where they stand, their order in the group can change; trees in chunks that are not loaded get theirs on load
+    level.world.restore_trees(state.trees)
+
+
+def encode(state):
+    writer = LevelWriter()
+    writer.pack('i', state.money)
+    for inventory in (state.item_inventory, state.seed_inventory):
+        writer.pack('H', len(inventory))
+        for item, amount in inventory.items():
+            writer.string(item)
+            writer.pack('i', amount)
+    writer.pack('dd?', *state.player_pos, state.raining)
+    writer.pack('ddd', *state.sky_color)
+
+    height, width = state.grid.shape
+    writer.pack('HH', height, width)
+    writer.data += state.grid.tobytes()
+
+    writer.pack('H', len(state.crops))
+    for plant_type, (ages, tiles) in state.crops.items():
+        writer.string(plant_type)
+        writer.pack('I', len(ages))
+        writer.align(8)
+        writer.data += ages.astype('<f8').tobytes()
+        writer.data += tiles.astype('<i4').tobytes()
+
+    writer.pack('H', len(state.trees))
+    for (left, bottom), (health, apples) in state.trees.items():
+        writer.pack('iiiH', left, bottom, health, len(apples))
+        for apple in apples:
+            writer.pack('ii', *apple)
+
+    payload = zlib.compress(bytes(writer.data), SAVE_COMPRESSION)
+    return struct.pack('<4sHII', SAVE_MAGIC, SAVE_VERSION, len(payload), zlib.crc32(payload)) + payload
+
+
+def decode(data):
+    # None if the data is not a save file of this version, or got damaged
+    header = struct.calcsize('<4sHII')
+    if len(data) < header:
+        return None
+    magic, version, length, crc = struct.unpack_from('<4sHII', data)
+    payload = data[header:header + length]
+    if magic != SAVE_MAGIC or version != SAVE_VERSION or len(payload) != length or zlib.crc32(payload) != crc:
+        return None
+    reader = LevelReader(zlib.decompress(payload))
+
+    money, = reader.unpack('i')
+    inventories = []
+    for _ in range(2):
+        inventory = {}
+        count, = reader.unpack('H')
+        for _ in range(count):
+            item = reader.string()
+            inventory[item], = reader.unpack('i')
+        inventories.append(inventory)
+    x, y, raining = reader.unpack('dd?')
+    sky_color = reader.unpack('ddd')
+
+    height, width = reader.unpack('HH')
+    grid = np.frombuffer(reader.buffer, np.uint8, height * width, reader.offset).reshape(height, width).copy()
+    reader.offset += height * width
+
+    crops = {}
+    count, = reader.unpack('H')
+    for _ in range(count):
+        plant_type = reader.string()
+        amount, = reader.unpack('I')
+        reader.align(8)
+        ages = np.frombuffer(reader.buffer, '<f8', amount, reader.offset).astype(np.float64)
+        reader.offset += amount * 8
+        tiles = np.frombuffer(reader.buffer, '<i4', amount * 2, reader.offset).reshape(amount, 2).astype(np.int32)
+        reader.offset += amount * 8
+        crops[plant_type] = (ages, tiles)
+
+    trees = {}
+    count, = reader.unpack('H')
+    for _ in range(count):
+        left, bottom, health, apple_count = reader.unpack('iiiH')
+        trees[left, bottom] = (health, [reader.unpack('ii') for _ in range(apple_count)])
+
+    return GameState(money, inventories[0], inventories[1], (x, y), raining, sky_color, grid, crops, trees)
+
+
+def write_save(path, state):
+    # write_file goes through a temp file, so quitting in the middle never leaves a broken save behind
+    write_file(path, encode(state))
+
+
+def read_save(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        return decode(file.read())
+
+
+class Autosaver:
+    # writes snapshots on a background thread; zlib and file writes let go of the gil, so the frame loop keeps running
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # only the newest snapshot matters, an older one that is still waiting gets replaced
+        self.pending = None
+        self.thread = None
+        # seconds the last background save took, and how many saves were written
+        self.save_time = 0
+        self.saves = 0
+        # the last save that could not be written, None if the last one worked
+        self.error = None
+
+    def save(self, state):
+        with self.lock:
+            self.pending = state
+            if self.thread is None:
+                self.thread = threading.Thread(target = self.work, name = 'autosave', daemon = True)
+                self.thread.start()
+
+    def work(self):
+        while True:
+            with self.lock:
+                state = self.pending
+                self.pending = None
+                if state is None:
+                    self.thread = None
+                    return
+            start = perf_counter()
+            try:
+                write_save(self.path, state)
+            except Exception as error:
+                # a full disk, a missing folder or a snapshot that cant be packed; the game keeps going and the next save tries again
+                self.error = error
+                continue
+            self.error = None
+            self.save_time = perf_counter() - start
+            self.saves += 1
+
+    def wait(self):
+        # call before quitting, so the last save is on disk; returns the error if it could not be written
+        thread = self.thread
+        if thread is not None:
+            thread.join()
+        return self.error
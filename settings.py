@@ -8,6 +8,34 @@ SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 768
 TILE_SIZE = 64
 
+# static tiles that nothing is y-sorted against get baked into one surface per chunk of CHUNK_SIZE x CHUNK_SIZE tiles
+BAKE_STATIC_LAYERS = True
+CHUNK_SIZE = 16
+# only the chunks within STREAM_MARGIN pixels of the screen have sprites, the rest of the map is kept compact;
+# for maps much bigger than the screen. Off builds every chunk at the start
+STREAM_WORLD = False
+STREAM_MARGIN = 4 * TILE_SIZE
+# water is drawn as one pre-tiled animated surface per chunk instead of one sprite per tile
+WATER_REGIONS = True
+
+# dirty rect mode; while the camera stands still only the parts of the screen that changed are drawn and sent to the window
+DIRTY_RECTS = True
+# if more than this share of the screen changed, drawing it all at once is cheaper
+DIRTY_MAX_AREA = 0.5
+
+# every image in these folders is decoded in parallel while the loading screen is up; None uses one thread per core
+# the tileset sheets in environment and objects and the ground in world are only read when the map is compiled, so they are left out
+GRAPHICS_PATH = '/Users/cat/Desktop/PyDewValley/graphics'
+PRELOAD_FOLDERS = ['character', 'fruit', 'overlay', 'rain', 'soil', 'soil_water', 'stumps', 'water']
+LOADING_WORKERS = None
+
+# sound effects share this many mixer channels; one effect can play at most SOUND_VOICES times at once
+SOUND_CHANNELS = 8
+SOUND_VOICES = 2
+
+# the farm is saved here at the start of every day, and loaded again when the game starts
+SAVE_PATH = '/Users/cat/Desktop/PyDewValley/data/save.sav'
+
 # overlay position
 OVERLAY_POSITIONS = {
     'tool': (40, SCREEN_HEIGHT - 15),
@@ -1,13 +1,13 @@
 import pygame
 from settings import *
 from support import import_folder
-from sprites import Generic
-from random import randint, choice
+from level_data import load_level
+from random import randint
+import numpy as np
 
 class Sky:
-    def __init__(self):
-        self.display_surface = pygame.display.get_surface()
-        self.full_surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    def __init__(self, lighting):
+        self.lighting = lighting
         self.start_color = [255, 255, 255]
         self.end_color = (38, 101, 189)
     
@@ -17,33 +17,59 @@ class Sky:
             if self.start_color[index] > value:
                 self.start_color[index] -= 2 * dt
 
-        self.full_surf.fill(self.start_color)
-        self.display_surface.blit(self.full_surf, (0,0), special_flags=pygame.BLEND_RGBA_MULT)
+        # the lighting multiplies the screen with it, together with the other tints
+        self.lighting.set_tint('sky', self.start_color)
+
+class RainParticles:
+    # every drop of one kind lives in the same preallocated arrays, so moving and ageing them is one step for all drops
+    def __init__(self, surfs, capacity, direction, speed, lifetime, rng):
+        self.surfs = surfs
+        self.rng = rng
+        # 2 units in neg direction, 4 units down, so movement is angled; speed (0, 0) means the drop stays where it lands
+        self.direction = np.array(direction, dtype = np.float32)
+        self.speed = speed
+        self.lifetime = lifetime
+
+        self.pos = np.zeros((capacity, 2), dtype = np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype = np.float32)
+        # milliseconds until the drop disappears
+        self.time_left = np.zeros(capacity, dtype = np.float32)
+        self.surf_index = np.zeros(capacity, dtype = np.intp)
+        self.alive = np.zeros(capacity, dtype = bool)
+        # drops are only created around the camera, so usually less than one per frame; the rest carries over
+        self.spawn_budget = 0
+
+    def spawn(self, count, area):
+        # reuse the slots of dead drops; if all slots are taken, no new drops this frame
+        slots = np.flatnonzero(~self.alive)[:count]
+        amount = len(slots)
+        if amount == 0:
+            return
+        self.pos[slots, 0] = self.rng.integers(area.left, area.right, amount, endpoint = True)
+        self.pos[slots, 1] = self.rng.integers(area.top, area.bottom, amount, endpoint = True)
+        speed = self.rng.integers(self.speed[0], self.speed[1], amount, endpoint = True)
+        self.velocity[slots] = self.direction * speed[:, None]
+        self.time_left[slots] = self.rng.integers(self.lifetime[0], self.lifetime[1], amount, endpoint = True)
+        self.surf_index[slots] = self.rng.integers(0, len(self.surfs), amount)
+        self.alive[slots] = True
 
-# importing generic since it saves a lot of lines of code
-class Drop(Generic):
-    def __init__(self, surf, pos, moving, groups, z):
-        # how drop functions; similar to particle class creating image then destroying it
-        super().__init__(pos, surf, groups, z)
-        self.lifetime = randint(400, 500)
-        self.start_time = pygame.time.get_ticks()
-        # moving raindrops
-        self.moving = moving
-        if self.moving:
-            # need pos direction and speed to move anything in pygame
-            self.pos = pygame.math.Vector2(self.rect.topleft)
-            # 2 units in neg direction, 4 units down, so movement is angled
-            self.direction = pygame.math.Vector2(-2, 4)
-            self.speed = randint(200,250)
     def update(self, dt):
-        # movement
-        if self.moving:
-            self.pos += self.direction * self.speed * dt
-            # assigning top left of rect to pos x
-            self.rect.topleft = (round(self.pos.x), round(self.pos.y))
+        alive = self.alive
+        self.pos[alive] += self.velocity[alive] * dt
+        self.time_left[alive] -= dt * 1000
         # destroy timer
-        if pygame.time.get_ticks() - self.start_time >= self.lifetime:
-            self.kill()
+        self.alive &= self.time_left > 0
+
+    def draw(self, surface, offset):
+        index = np.flatnonzero(self.alive)
+        if len(index) == 0:
+            return
+        # top left on screen, rounded like a sprite rect
+        screen_pos = np.round(self.pos[index] - (offset.x, offset.y)).astype(int)
+        on_screen = ((screen_pos[:, 0] > -TILE_SIZE) & (screen_pos[:, 0] < SCREEN_WIDTH) &
+                     (screen_pos[:, 1] > -TILE_SIZE) & (screen_pos[:, 1] < SCREEN_HEIGHT))
+        surfs = [self.surfs[i] for i in self.surf_index[index[on_screen]]]
+        surface.blits(zip(surfs, screen_pos[on_screen].tolist()), doreturn = False)
 
 
 class Rain:
@@ -51,24 +77,34 @@ class Rain:
         self.all_sprites = all_sprites
         self.rain_drops = import_folder('/Users/cat/Desktop/PyDewValley/graphics/rain/drops')
         self.rain_floor = import_folder('/Users/cat/Desktop/PyDewValley/graphics/rain/floor')
-        self.floor_w, self.floor_h = pygame.image.load('/Users/cat/Desktop/PyDewValley/graphics/world/ground.png').get_size()
+        # size of the map in pixels
+        level_data = load_level('/Users/cat/Desktop/PyDewValley/data/map.tmx')
+        self.floor_w, self.floor_h = level_data.width * TILE_SIZE, level_data.height * TILE_SIZE
+        # how many drops of each kind fall on the whole map every frame
+        self.intensity = 1
 
-    def create_floor(self):
-        Drop(
-            surf=choice(self.rain_floor),
-            pos=(randint(0, self.floor_w), randint(0, self.floor_h)),
-            moving=False,
-            groups=self.all_sprites,
-            z=LAYERS['rain floor'])
-        
-    def create_drops(self):
-        Drop(
-            surf=choice(self.rain_drops),
-            pos=(randint(0, self.floor_w), randint(0, self.floor_h)),
-            moving=True,
-            groups=self.all_sprites,
-            z=LAYERS['rain drops'])
+        rng = np.random.default_rng(randint(0, 2 ** 32 - 1))
+        self.floor = RainParticles(self.rain_floor, 512, (0, 0), (0, 0), (400, 500), rng)
+        self.drops = RainParticles(self.rain_drops, 512, (-2, 4), (200, 250), (400, 500), rng)
+
+        # the camera draws them between the sprites of their layer
+        all_sprites.add_layer_draw(LAYERS['rain floor'], self.floor.draw)
+        all_sprites.add_layer_draw(LAYERS['rain drops'], self.drops.draw)
+
+    def spawn(self, particles, area):
+        # only rain where the camera can see, but just as many drops per pixel as if it was raining on the whole map
+        particles.spawn_budget += self.intensity * area.width * area.height / (self.floor_w * self.floor_h)
+        count = int(particles.spawn_budget)
+        particles.spawn_budget -= count
+        particles.spawn(count, area)
+
+    def update(self, dt):
+        ground = pygame.Rect(0, 0, self.floor_w, self.floor_h)
+        offset = self.all_sprites.offset
+        view = pygame.Rect(offset.x, offset.y, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.spawn(self.floor, view.clip(ground))
+        # drops move left and down, so they can also start above and right of the screen
+        self.spawn(self.drops, pygame.Rect(view.left, view.top - 500, view.width + 250, view.height + 500).clip(ground))
 
-    def update(self):
-        self.create_floor()
-        self.create_drops()
\ No newline at end of file
+        self.floor.update(dt)
+        self.drops.update(dt)
@@ -1,8 +1,21 @@
 import pygame
 from settings import *
-from pytmx.util_pygame import load_pygame
+from level_data import load_level
 from support import *
 from random import choice
+from collision import update_hitbox
+import numpy as np
+
+# soil grid; every cell is one byte and every flag is one bit of it
+FARMABLE = np.uint8(1)
+TILLED = np.uint8(2)
+WATERED = np.uint8(4)
+PLANTED = np.uint8(8)
+# the letters the grid used to hold for each flag
+CELL_MARKERS = {FARMABLE: 'F', TILLED: 'X', WATERED: 'W', PLANTED: 'P'}
+
+# neighbour mask of a tilled cell (top 1, right 2, bottom 4, left 8) -> which soil tile to use
+SOIL_TILE_TYPES = ['o', 'b', 'l', 'bl', 't', 'tb', 'tl', 'tbr', 'r', 'br', 'lr', 'lrb', 'tr', 'tbl', 'lrt', 'x']
 
 class SoilTile(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups):
@@ -19,48 +32,140 @@ class WaterTile(pygame.sprite.Sprite):
         self.z = LAYERS['soil water']
 
 class Plant(pygame.sprite.Sprite):
-    def __init__(self, plant_type, groups, soil, check_watered):
+    def __init__(self, plant_type, groups, soil, crops, index):
         super().__init__(groups)
         # setup
         self.plant_type = plant_type
-        self.frames = import_folder(f'/Users/cat/Desktop/PyDewValley/graphics/fruit/{plant_type}')
         self.soil = soil
-        self.check_watered = check_watered
-
-        # plant growth mechanics
-        self.age = 0
-        self.max_age = len(self.frames) - 1
-        self.grow_speed = GROW_SPEED[plant_type]
+        # age, growth and whether the plant is watered live in the crop store, this sprite only shows it
+        self.crops = crops
+        self.index = index
         self.harvestable = False
 
         # sprite setup
-        self.image = self.frames[self.age]
         # offset for plant placement
         self.y_offset = -16 if plant_type == 'corn' else -8
-        self.rect = self.image.get_rect(midbottom = soil.rect.midbottom + pygame.math.Vector2(0,self.y_offset))
         # plant is always below player
         self.z = LAYERS['ground plant']
-
-    def grow(self):
-        if self.check_watered(self.rect.center):
-            self.age += self.grow_speed
-            # player should be able to collide with plant. move plant to main layer
-            if int(self.age) > 0:
-                self.z = LAYERS['main']
-                # once plant has certain age, add hitbox
-                self.hitbox = self.rect.copy().inflate(-26, self.rect.height * 0.4)
-
-            # age could be floating pt value, so turn into int
-            self.image = self.frames[int(self.age)]
-            
-            if self.age >= self.max_age:
-                self.age = self.max_age
-                self.harvestable = True
-
-            # image is going to change and have diff dimensions
-            self.rect = self.image.get_rect(
-                midbottom=self.soil.rect.midbottom + pygame.math.Vector2(0, self.y_offset))
-
+        self.set_frame(crops.frames[plant_type][0])
+        # growing changes the rect and the layer, so the camera has to keep re-sorting it
+        self.dynamic = True
+
+    @property
+    def age(self):
+        return float(self.crops.age[self.index])
+
+    def set_frame(self, image, frame = 0, harvestable = False):
+        # image is going to change and have diff dimensions
+        self.image = image
+        self.rect = self.image.get_rect(midbottom = (self.soil.rect.centerx, self.soil.rect.bottom + self.y_offset))
+
+        # player should be able to collide with plant. move plant to main layer
+        if frame > 0:
+            self.z = LAYERS['main']
+            # once plant has certain age, add hitbox
+            self.hitbox = self.rect.copy().inflate(-26, self.rect.height * 0.4)
+            update_hitbox(self)
+        self.harvestable = harvestable
+
+class CropStore:
+    # every crop on the farm, one slot per crop in parallel arrays, so a day of growth for all crops is a few array operations
+    def __init__(self, capacity = 64):
+        self.plant_types = list(GROW_SPEED)
+        self.frames = {plant_type: import_folder(f'/Users/cat/Desktop/PyDewValley/graphics/fruit/{plant_type}') for plant_type in self.plant_types}
+        # last frame is the ripe crop
+        self.type_max_age = np.array([len(self.frames[plant_type]) - 1 for plant_type in self.plant_types], dtype = np.float64)
+        self.type_grow_speed = np.array([GROW_SPEED[plant_type] for plant_type in self.plant_types], dtype = np.float64)
+
+        self.plant_type = np.zeros(capacity, dtype = np.uint8)
+        # age could be floating pt value, the frame is int(age)
+        self.age = np.zeros(capacity, dtype = np.float64)
+        self.grow_speed = np.zeros(capacity, dtype = np.float64)
+        self.watered = np.zeros(capacity, dtype = bool)
+        # grid x and y of the cell the crop grows in
+        self.tile = np.zeros((capacity, 2), dtype = np.intp)
+        self.alive = np.zeros(capacity, dtype = bool)
+        self.sprites = [None] * capacity
+        # chunk key -> slots of the crops in it, so a chunk finds its crops without looking at the whole farm
+        self.chunks = {}
+        # stack of the slots without a crop, lowest slot on top
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def add(self, plant_type, x, y):
+        # returns the slot of the new crop; the sprite is attached once it exists
+        if not self.free:
+            self.grow_capacity()
+        index = self.free.pop()
+        type_index = self.plant_types.index(plant_type)
+        self.plant_type[index] = type_index
+        self.age[index] = 0
+        self.grow_speed[index] = self.type_grow_speed[type_index]
+        self.watered[index] = False
+        self.tile[index] = x, y
+        self.alive[index] = True
+        self.chunks.setdefault((x // CHUNK_SIZE, y // CHUNK_SIZE), set()).add(index)
+        return index
+
+    def remove(self, index):
+        x, y = self.tile[index]
+        self.chunks[int(x) // CHUNK_SIZE, int(y) // CHUNK_SIZE].discard(index)
+        self.alive[index] = False
+        self.sprites[index] = None
+        self.free.append(index)
+
+    def clear(self):
+        self.alive[:] = False
+        self.sprites = [None] * len(self.alive)
+        self.chunks.clear()
+        self.free = list(range(len(self.alive) - 1, -1, -1))
+
+    def slots_in(self, chunks):
+        # slots of the crops in some chunks
+        return np.array([index for chunk in chunks for index in self.chunks.get(chunk, ())], dtype = np.intp)
+
+    def grow_capacity(self):
+        # double every array, the old slots keep their index
+        capacity = len(self.alive)
+        for name in ('plant_type', 'age', 'grow_speed', 'watered', 'tile', 'alive'):
+            old = getattr(self, name)
+            new = np.zeros((capacity * 2,) + old.shape[1:], dtype = old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+        self.sprites += [None] * capacity
+        self.free.extend(range(capacity * 2 - 1, capacity - 1, -1))
+
+    def grow(self, grid, index = None):
+        # one day of growth for every crop (or the crops in index) that is in a watered cell
+        if index is None:
+            index = np.flatnonzero(self.alive)
+        x, y = self.tile[index, 0], self.tile[index, 1]
+        self.watered[index] = grid[y, x] & WATERED != 0
+        index = index[self.watered[index]]
+
+        old_frame = self.age[index].astype(int)
+        # ripe crops stay at their last frame
+        max_age = self.type_max_age[self.plant_type[index]]
+        self.age[index] = np.minimum(self.age[index] + self.grow_speed[index], max_age)
+        new_frame = self.age[index].astype(int)
+
+        # only the sprites that get a new image have to be touched
+        changed = new_frame != old_frame
+        ripened = []
+        for slot, frame, ripe in zip(index[changed], new_frame[changed], (self.age[index] >= max_age)[changed]):
+            sprite = self.sprites[slot]
+            # crops in chunks that are not loaded have no sprite; they get one showing their age once the chunk loads
+            if sprite is None:
+                continue
+            sprite.set_frame(self.frames[sprite.plant_type][frame], frame, bool(ripe))
+            if ripe:
+                ripened.append(sprite)
+        # the crops that can be harvested since today
+        return ripened
+
+    def catch_up(self, index, days):
+        # days of growth at once, for crops without sprites; they show their age once they get a sprite
+        max_age = self.type_max_age[self.plant_type[index]]
+        self.age[index] = np.minimum(self.age[index] + self.grow_speed[index] * days, max_age)
 
 class SoilLayer:
     def __init__(self, all_sprites, collision_sprites):
@@ -71,166 +176,315 @@ class SoilLayer:
         self.soil_sprites = pygame.sprite.Group()
         self.water_sprites = pygame.sprite.Group()
         self.plant_sprites = pygame.sprite.Group()
+        # tile index; (x, y) of a cell -> its soil tile, water tile and plant
+        self.soil_tiles = {}
+        self.water_tiles = {}
+        self.plant_tiles = {}
+        # only the plants that are ripe, so harvesting does not have to look at the whole farm
+        self.harvestable_tiles = {}
+        self.crops = CropStore()
+        self.raining = False
+        # chunks (in CHUNK_SIZE tiles) that have sprites; None means the whole farm has them.
+        # the grid and the crop store always hold the whole farm, they are small
+        self.active_chunks = None
+        # only crops of chunks with sprites grow at the end of a day; the others catch up when their chunk loads again.
+        # days that went by, whether rain watered the farm at the start of each day, and the day every chunk without
+        # sprites was unloaded
+        self.day = 0
+        self.rained = [False]
+        self.chunk_days = {}
 
         # graphics
         self.soil_surfs = import_folder_dict('/Users/cat/Desktop/PyDewValley/graphics/soil/')
         self.water_surfs = import_folder('/Users/cat/Desktop/PyDewValley/graphics/soil_water')
 
         self.create_soil_grid()
-        self.create_hit_rects()
 
         # hoeing soil sound
-        self.hoe_sound = pygame.mixer.Sound('/Users/cat/Desktop/PyDewValley/audio/hoe.wav')
-        self.hoe_sound.set_volume(0.1)
+        self.hoe_sound = import_sound('/Users/cat/Desktop/PyDewValley/audio/hoe.wav', 0.1)
 
         # plant sound
-        self.plant_sound = pygame.mixer.Sound('/Users/cat/Desktop/PyDewValley/audio/plant.wav')
-        self.plant_sound.set_volume(0.2)
+        self.plant_sound = import_sound('/Users/cat/Desktop/PyDewValley/audio/plant.wav', 0.2)
 
     # if area is farmable
     def create_soil_grid(self):
-        ground = pygame.image.load('/Users/cat/Desktop/PyDewValley/graphics/world/ground.png')
-        # how many horizontal + vertical tiles exist?
-        h_tiles, v_tiles = ground.get_width() // TILE_SIZE, ground.get_height() // TILE_SIZE
-        # list comprehension, go thru every column
-        self.grid = [[[]for col in range(h_tiles)] for row in range(v_tiles)]
-        for x, y, _ in load_pygame('/Users/cat/Desktop/PyDewValley/data/map.tmx').get_layer_by_name('Farmable').tiles():
-            # figure out which cells correspond to x and y values by printing "F" on each list that is farmable
-            self.grid[y][x].append('F')
-    
-    def create_hit_rects(self):
-        self.hit_rects = []
-        # cycle thru grid list and convert all cells into actual positions; use enum method
-        for index_row, row in enumerate(self.grid):
-            # we are going to have a couple of lists, and inside each lists there exists more lists. for loop goes thru list vertically + horizontally
-            for index_col, cell in enumerate(row):
-                if 'F' in cell:
-                    x = index_col * TILE_SIZE
-                    y = index_row * TILE_SIZE
-                    rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-                    self.hit_rects.append(rect)
+        level_data = load_level('/Users/cat/Desktop/PyDewValley/data/map.tmx')
+        # one row per vertical tile of the map, one byte per horizontal tile
+        farmable = np.frombuffer(level_data.farmable, dtype = np.uint8).reshape(level_data.height, level_data.width)
+        self.grid = farmable * FARMABLE
+
+    def is_active(self, x, y):
+        return self.active_chunks is None or (x // CHUNK_SIZE, y // CHUNK_SIZE) in self.active_chunks
+
+    def cell(self, x, y):
+        # the old list of letters for one cell, e.g. ['F', 'X', 'W']
+        return [marker for flag, marker in CELL_MARKERS.items() if self.grid[y, x] & flag]
+
+    def count(self, flag):
+        # how many cells have a flag, e.g. count(PLANTED)
+        return int(np.count_nonzero(self.grid & flag))
+
+    def cell_at(self, pos):
+        # tile index; grid x and y of the cell under a position, or None if it is outside the grid
+        x = int(pos[0] // TILE_SIZE)
+        y = int(pos[1] // TILE_SIZE)
+        if 0 <= y < self.grid.shape[0] and 0 <= x < self.grid.shape[1]:
+            return x, y
+        return None
 
     def get_hit(self, point):
-        # point player will be able to hit
-        for rect in self.hit_rects:
-            # for each rectangle, if its being hit by point specified in parameter
-            if rect.collidepoint(point):
-                self.hoe_sound.play()
-                # convert hit_rects back into self.grid
-                x = rect.x // TILE_SIZE
-                y = rect.y // TILE_SIZE
-
-                if 'F' in self.grid[y][x]:
-                    self.grid[y][x].append('X')
-                    self.create_soil_tiles()
-
-    #checks if position hits soil sprites
+        # point player will be able to hit; goes straight to the cell under it
+        cell = self.cell_at(point)
+        if cell and self.grid[cell[1], cell[0]] & FARMABLE:
+            self.hoe_sound.play()
+            x, y = cell
+
+            if not self.grid[y, x] & TILLED:
+                self.grid[y, x] |= TILLED
+                # only this cell and its neighbours can look different now
+                self.update_soil_tiles(x, y)
+                # fresh soil gets wet right away when it is raining
+                if self.raining:
+                    self.water_cell(x, y)
+
+    def water_cell(self, x, y):
+        # add watered flag to the cell
+        self.grid[y, x] |= WATERED
+        if self.is_active(x, y):
+            self.add_water_tile(x, y)
+
+    def add_water_tile(self, x, y):
+        surf = choice(self.water_surfs)
+        # create water tile to visually indicate we have watered soil
+        self.water_tiles[x, y] = WaterTile((x * TILE_SIZE, y * TILE_SIZE), surf, [self.all_sprites, self.water_sprites])
+
+    #checks if position hits soil
     def water(self, target_pos):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(target_pos):
-                # add entry to soil grid -> adding 'W' to cell
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                self.grid[y][x].append('W')
-                # store position
-                pos = soil_sprite.rect.topleft
-                surf = choice(self.water_surfs)
-                # create water tile to visually indicate we have watered soil
-                WaterTile(pos, surf, [self.all_sprites, self.water_sprites])
+        cell = self.cell_at(target_pos)
+        # cells that are already watered keep their one water tile
+        if cell and cell in self.soil_tiles and cell not in self.water_tiles:
+            self.water_cell(*cell)
+
+    def water_all(self):
+        # rain waters every tilled cell that is still dry; the flags of the whole farm at once, water tiles only where there are sprites
+        dry = (self.grid & TILLED != 0) & (self.grid & WATERED == 0)
+        self.grid[dry] |= WATERED
+        for left, top, right, bottom in self.sprite_bounds():
+            for row, col in np.argwhere(dry[top:bottom, left:right]):
+                self.add_water_tile(left + int(col), top + int(row))
+        self.rained[self.day] = True
 
     # removing water tile every time we restart the day
     def remove_water(self):
         # destroy water sprites
         for sprite in self.water_sprites.sprites():
             sprite.kill()
-        # clean up grid
-        for row in self.grid:
-            for cell in row:
-                if 'W' in cell:
-                    cell.remove('W')
-
-    def check_watered(self, pos):
-        x = pos[0] // TILE_SIZE
-        y = pos[1] // TILE_SIZE
-        cell = self.grid[y][x]
-        is_watered = 'W' in cell
-        return is_watered
+        self.water_tiles.clear()
+        # clean up grid; takes the water flag off every cell at once
+        self.grid &= ~WATERED
 
     def plant_seed(self, target_pos, seed):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(target_pos):
-                # play planting sound when planting seed
-                self.plant_sound.play()
-                # x and y pos inside grid
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                # P makes sure we have a plant in cell
-                if 'P' not in self.grid[y][x]:
-                    self.grid[y][x].append('P')
-                    # creating plant
-                    Plant(seed, [self.all_sprites, self.plant_sprites, self.collision_sprites], soil_sprite, self.check_watered)
-
+        cell = self.cell_at(target_pos)
+        if cell and cell in self.soil_tiles:
+            # play planting sound when planting seed
+            self.plant_sound.play()
+            x, y = cell
+            # planted flag makes sure we only have one plant in a cell
+            if not self.grid[y, x] & PLANTED:
+                self.grid[y, x] |= PLANTED
+                # creating plant; it gets a slot in the crop store first
+                index = self.crops.add(seed, x, y)
+                self.add_plant(index, cell)
+
+    def add_plant(self, index, cell):
+        # sprite for the crop in a slot of the crop store, showing the frame of its age
+        crops = self.crops
+        plant_type = crops.plant_types[crops.plant_type[index]]
+        plant = Plant(plant_type, [self.all_sprites, self.plant_sprites, self.collision_sprites], self.soil_tiles[cell], crops, index)
+        frame = int(crops.age[index])
+        if frame > 0:
+            frames = crops.frames[plant_type]
+            ripe = crops.age[index] >= crops.type_max_age[crops.plant_type[index]]
+            plant.set_frame(frames[min(frame, len(frames) - 1)], frame, bool(ripe))
+            if ripe:
+                self.harvestable_tiles[cell] = plant
+        crops.sprites[index] = plant
+        self.plant_tiles[cell] = plant
+
+    def remove_plant(self, plant):
+        # plant was harvested; the cell is the one of the soil it grows on
+        cell = self.cell_at(plant.soil.rect.topleft)
+        self.grid[cell[1], cell[0]] &= ~PLANTED
+        self.plant_tiles.pop(cell, None)
+        self.harvestable_tiles.pop(cell, None)
+        self.crops.remove(plant.index)
+        plant.kill()
+
+    def restore(self, grid, crops):
+        # soil and crops from a save; every soil, water and plant sprite is made again from the grid
+        for group in (self.soil_sprites, self.water_sprites, self.plant_sprites):
+            for sprite in group.sprites():
+                sprite.kill()
+        self.soil_tiles.clear()
+        self.water_tiles.clear()
+        self.plant_tiles.clear()
+        self.harvestable_tiles.clear()
+        self.crops.clear()
+        self.chunk_days.clear()
+
+        # farmable comes from the map, a save from before the map changed keeps only what still fits
+        rows, cols = min(grid.shape[0], self.grid.shape[0]), min(grid.shape[1], self.grid.shape[1])
+        farmable = self.grid & FARMABLE
+        self.grid[:] = 0
+        # planted flags come back with the crops below
+        self.grid[:rows, :cols] = grid[:rows, :cols] & ~(FARMABLE | PLANTED)
+        self.grid |= farmable
+
+        for plant_type, (ages, tiles) in crops.items():
+            if plant_type not in self.crops.plant_types:
+                continue
+            for age, (x, y) in zip(ages, tiles):
+                x, y = int(x), int(y)
+                if not (y < rows and x < cols and self.grid[y, x] & TILLED):
+                    continue
+                index = self.crops.add(plant_type, x, y)
+                self.crops.age[index] = age
+                self.grid[y, x] |= PLANTED
+
+        # sprites only for the chunks that are loaded, the crops of the others wait for their chunk
+        if self.active_chunks is None:
+            self.build_cells(0, 0, self.grid.shape[1], self.grid.shape[0])
+        else:
+            for chunk in self.crops.chunks:
+                if chunk not in self.active_chunks:
+                    self.park(chunk)
+            for chunk in self.active_chunks:
+                self.load_chunk(chunk)
+
+    def sprite_bounds(self):
+        # bounds of the parts of the farm that have sprites
+        if self.active_chunks is None:
+            return [(0, 0, self.grid.shape[1], self.grid.shape[0])]
+        return [self.chunk_bounds(chunk) for chunk in self.active_chunks]
+
+    def chunk_bounds(self, chunk):
+        # left, top, right, bottom in tiles, cut to the grid
+        left, top = chunk[0] * CHUNK_SIZE, chunk[1] * CHUNK_SIZE
+        return left, top, min(left + CHUNK_SIZE, self.grid.shape[1]), min(top + CHUNK_SIZE, self.grid.shape[0])
+
+    def build_cells(self, left, top, right, bottom):
+        # soil, water and plant sprites for every cell in the bounds, from the grid and the crop store
+        cells = self.grid[top:bottom, left:right]
+        masks = self.neighbour_masks(left, top, right, bottom)
+        for row, col in np.argwhere(cells & TILLED):
+            self.set_soil_tile(left + int(col), top + int(row), masks[row, col])
+        for row, col in np.argwhere(cells & WATERED):
+            x, y = left + int(col), top + int(row)
+            if (x, y) not in self.water_tiles:
+                self.add_water_tile(x, y)
+
+        # only the crops of the chunks the bounds touch
+        crops = self.crops
+        chunks = [(cx, cy) for cx in range(left // CHUNK_SIZE, (right - 1) // CHUNK_SIZE + 1)
+                  for cy in range(top // CHUNK_SIZE, (bottom - 1) // CHUNK_SIZE + 1)]
+        for index in crops.slots_in(chunks):
+            cell = (int(crops.tile[index, 0]), int(crops.tile[index, 1]))
+            if left <= cell[0] < right and top <= cell[1] < bottom and crops.sprites[index] is None and cell in self.soil_tiles:
+                self.add_plant(int(index), cell)
+
+    def park(self, chunk):
+        # crops of a chunk without sprites stop growing until it loads again; the water they have now lasts them
+        # until the next morning, after that only rain waters them
+        index = self.crops.slots_in([chunk])
+        x, y = self.crops.tile[index, 0], self.crops.tile[index, 1]
+        self.crops.watered[index] = self.grid[y, x] & WATERED != 0
+        self.chunk_days[chunk] = self.day
+
+    def catch_up(self, chunk):
+        # crops of a chunk that was not loaded grow the days they missed all at once
+        day = self.chunk_days.pop(chunk, self.day)
+        if day == self.day:
+            return
+        index = self.crops.slots_in([chunk])
+        days = self.crops.watered[index] + self.rained[day + 1:self.day].count(True)
+        self.crops.catch_up(index, days)
+
+    def catch_up_all(self):
+        # every crop at the age of today, e.g. for saving
+        for chunk in list(self.chunk_days):
+            self.catch_up(chunk)
+            self.park(chunk)
+
+    def load_chunk(self, chunk):
+        self.catch_up(chunk)
+        self.build_cells(*self.chunk_bounds(chunk))
+
+    def unload_chunk(self, chunk):
+        # the sprites go, the grid and the crop store keep everything about the cells
+        self.park(chunk)
+        left, top, right, bottom = self.chunk_bounds(chunk)
+        for tiles in (self.soil_tiles, self.water_tiles, self.plant_tiles):
+            for cell in [cell for cell in tiles if left <= cell[0] < right and top <= cell[1] < bottom]:
+                sprite = tiles.pop(cell)
+                if tiles is self.plant_tiles:
+                    self.crops.sprites[sprite.index] = None
+                    self.harvestable_tiles.pop(cell, None)
+                sprite.kill()
 
     def update_plants(self):
-        for plant in self.plant_sprites.sprites():
-            plant.grow()
-
-    def create_soil_tiles(self):
-        # get rid of all existing soil tiles
-        self.soil_sprites.empty()
-        # look thru entire grid, wherever theres an X, create soil tile
-        for index_row, row in enumerate(self.grid):
-            for index_col, cell in enumerate(row):
-                if 'X' in cell:
-
-                    # tile options; whats to left, right, top, bottom of current cell?
-                    t = 'X' in self.grid[index_row - 1][index_col]
-                    b = 'X' in self.grid[index_row + 1][index_col]
-                    r = 'X' in row[index_col + 1]
-                    l = 'X' in row[index_col - 1]
-
-                    tile_type = 'o'
-
-                    # all sides; all checks if all values inside list are true
-                    if all((t, r, b, l)): tile_type = 'x'
-
-                    # horizontal; check if there is a tile to the left, right, or both sides
-                    # any works like all, only a single one has to be true for any statement to work
-                    if l and not any((t,r,b)): tile_type = 'r'
-                    if r and not any((t,l,b)): tile_type = 'l'
-                    if r and l and not any((t,b)): tile_type = 'lr'
-
-                    # vertical tiles
-                    if t and not any((r,l,b)): tile_type = 'b'
-                    if b and not any((r,l,t)): tile_type = 't'
-                    if b and t and not any((r,l)): tile_type = 'tb'
-
-                    # corners
-                    if l and b and not any((t,r)): tile_type = 'tr'
-                    if r and b and not any((t,l)): tile_type = 'tl'
-                    if l and t and not any((b,r)): tile_type = 'br'
-                    if r and t and not any((b,l)): tile_type = 'bl'
-
-                    # t-shapes
-                    if all((t,b,r)) and not l: tile_type = 'tbr'
-                    if all((t,b,l)) and not r: tile_type = 'tbl'
-                    if all((l,r,t)) and not b: tile_type = 'lrb'
-                    if all((l,r,b)) and not t: tile_type = 'lrt'
-
-
-
-                    SoilTile(pos=(index_col * TILE_SIZE, index_row * TILE_SIZE),
-                             surf=self.soil_surfs[tile_type],
-                             groups=[self.all_sprites, self.soil_sprites])
-
-
-        
-    
-
-        # requirements for each tile
-
-        # if area is farmable
-
-        # if soil has been watered
-
-        # if soil currently has a plant
\ No newline at end of file
+        # every crop of the loaded chunks at once
+        if self.active_chunks is None:
+            ripened = self.crops.grow(self.grid)
+        else:
+            ripened = self.crops.grow(self.grid, self.crops.slots_in(self.active_chunks))
+        for plant in ripened:
+            self.harvestable_tiles[self.cell_at(plant.soil.rect.topleft)] = plant
+        # next day; it only counts as rained on once water_all runs
+        self.day += 1
+        self.rained.append(False)
+
+    def harvestable_near(self, rect):
+        # ripe plants in the cells under rect; plants reach up into the cell above their own, so one row below rect counts too
+        left = rect.left // TILE_SIZE
+        right = (rect.right - 1) // TILE_SIZE
+        top = rect.top // TILE_SIZE
+        bottom = (rect.bottom - 1) // TILE_SIZE + 1
+        return [self.harvestable_tiles[x, y]
+                for y in range(top, bottom + 1) for x in range(left, right + 1)
+                if (x, y) in self.harvestable_tiles]
+
+    def neighbour_masks(self, left, top, right, bottom):
+        # for every cell in the bounds: which of its 4 neighbours are tilled (top 1, right 2, bottom 4, left 8), all at once
+        height, width = self.grid.shape
+        # the bounds and one cell around them; cells outside the grid are never tilled
+        tilled = np.zeros((bottom - top + 2, right - left + 2), dtype = np.uint8)
+        outer_top, outer_left = max(top - 1, 0), max(left - 1, 0)
+        outer_bottom, outer_right = min(bottom + 1, height), min(right + 1, width)
+        tilled[outer_top - top + 1:outer_bottom - top + 1, outer_left - left + 1:outer_right - left + 1] = \
+            self.grid[outer_top:outer_bottom, outer_left:outer_right] & TILLED != 0
+        return tilled[:-2, 1:-1] | tilled[1:-1, 2:] << 1 | tilled[2:, 1:-1] << 2 | tilled[1:-1, :-2] << 3
+
+    def neighbour_mask(self, x, y):
+        # same as neighbour_masks, just for one cell
+        mask = 0
+        for bit, (dx, dy) in enumerate(((0, -1), (1, 0), (0, 1), (-1, 0))):
+            nx, ny = x + dx, y + dy
+            if 0 <= ny < self.grid.shape[0] and 0 <= nx < self.grid.shape[1] and self.grid[ny, nx] & TILLED:
+                mask |= 1 << bit
+        return mask
+
+    def set_soil_tile(self, x, y, mask):
+        surf = self.soil_surfs[SOIL_TILE_TYPES[mask]]
+        if (x, y) in self.soil_tiles:
+            # tile already exists, it only needs the new image
+            self.soil_tiles[x, y].image = surf
+        else:
+            self.soil_tiles[x, y] = SoilTile(pos=(x * TILE_SIZE, y * TILE_SIZE),
+                                             surf=surf,
+                                             groups=[self.all_sprites, self.soil_sprites])
+
+    def update_soil_tiles(self, x, y):
+        # the cell that was hit and its 4 neighbours
+        for cell_x, cell_y in ((x, y), (x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+            if 0 <= cell_y < self.grid.shape[0] and 0 <= cell_x < self.grid.shape[1] and self.grid[cell_y, cell_x] & TILLED:
+                self.set_soil_tile(cell_x, cell_y, self.neighbour_mask(cell_x, cell_y))
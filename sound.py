@@ -0,0 +1,108 @@
+import pygame
+from settings import *
+
+
+class NullSound:
+    # stands in for a sound when there is no mixer, e.g. in headless runs
+    def play(self, *args, **kwargs):
+        pass
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+
+class BankedSound:
+    # what import_sound hands out; many objects can hold one, the decoded sound itself is only in the bank once
+    def __init__(self, bank, path, volume, priority, voices):
+        self.bank = bank
+        self.path = path
+        self.volume = volume
+        # a sound can take the channel of a sound with the same or a lower priority when every channel is busy
+        self.priority = priority
+        # how many copies of this sound can play at once; one more and the oldest copy is cut off
+        self.voices = voices
+
+    def play(self):
+        self.bank.play(self)
+
+    def stop(self):
+        self.bank.stop(self.path)
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+
+class SoundBank:
+    # every effect is decoded once and played through a fixed set of channels, so spamming one sound
+    # cant use up the channels the other sounds need
+    def __init__(self, channels = SOUND_CHANNELS):
+        self.channel_count = channels
+        # path -> decoded sound
+        self.sounds = {}
+        # channels are made once the mixer is running
+        self.channels = None
+        # channel index -> (path, priority, play order) of what it played last
+        self.playing = []
+        self.play_count = 0
+
+    def start(self):
+        pygame.mixer.set_num_channels(self.channel_count)
+        self.channels = [pygame.mixer.Channel(index) for index in range(self.channel_count)]
+        self.playing = [None] * self.channel_count
+
+    def load(self, path, volume = None, priority = 0, voices = SOUND_VOICES):
+        # without a mixer (no sound card, or headless) every sound is silent
+        if not pygame.mixer.get_init():
+            return NullSound()
+        if self.channels is None:
+            self.start()
+        if path not in self.sounds:
+            self.sounds[path] = pygame.mixer.Sound(path)
+        return BankedSound(self, path, 1 if volume is None else volume, priority, voices)
+
+    def pick_channel(self, handle):
+        # index of the channel to play on, or None if the sound is dropped
+        busy = {index: self.playing[index] for index, channel in enumerate(self.channels)
+                if self.playing[index] and channel.get_busy()}
+        # same sound is already playing as often as it may, the oldest copy makes room
+        same = [index for index, (path, _, __) in busy.items() if path == handle.path]
+        if len(same) >= handle.voices:
+            return min(same, key = lambda index: busy[index][2])
+        for index in range(len(self.channels)):
+            if index not in busy:
+                return index
+        # every channel is busy; take the oldest of the least important sounds, unless they are all more important than this one
+        weaker = [index for index, (_, priority, __) in busy.items() if priority <= handle.priority]
+        if weaker:
+            return min(weaker, key = lambda index: (busy[index][1], busy[index][2]))
+        return None
+
+    def play(self, handle):
+        index = self.pick_channel(handle)
+        if index is None:
+            return
+        channel = self.channels[index]
+        channel.play(self.sounds[handle.path])
+        channel.set_volume(handle.volume)
+        self.play_count += 1
+        self.playing[index] = (handle.path, handle.priority, self.play_count)
+
+    def stop(self, path):
+        for index, playing in enumerate(self.playing):
+            if playing and playing[0] == path:
+                self.channels[index].stop()
+
+    def play_music(self, path, volume = None, loops = -1):
+        # music is streamed from the file by pygame.mixer.music, it is never decoded into memory as a whole
+        if not pygame.mixer.get_init():
+            return
+        pygame.mixer.music.load(path)
+        if volume is not None:
+            pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops)
+
+
+sound_bank = SoundBank()
@@ -1,7 +1,9 @@
 import pygame
 from settings import *
 from random import randint, choice
-from timer import Timer
+from timer import Timer, game_clock
+from collision import update_hitbox
+from support import import_image, import_sound
 
 class Generic(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups, z=LAYERS['main']):
@@ -21,28 +23,30 @@ class Interaction(Generic):
         self.name = name
 
 
-# water inherits from generic
-class Water(Generic):
-    def __init__(self, pos, frames, groups):
-        # needs animation, so add frames and method to loop over frames
+# water tiles have no update of their own, they show the current frame of the shared water animation
+class Water(pygame.sprite.Sprite):
+    def __init__(self, pos, animation, groups):
+        super().__init__(groups)
+        self.animation = animation
+        self.rect = animation.image.get_rect(topleft = pos)
+        self.z = LAYERS['water']
+
+    @property
+    def image(self):
+        return self.animation.image
+
+# a whole chunk of water in one sprite; frames are the chunk already tiled with every frame of the water animation
+class WaterRegion(pygame.sprite.Sprite):
+    def __init__(self, pos, frames, animation, groups):
+        super().__init__(groups)
         self.frames = frames
-        self.frame_index = 0
-
-        # begin sprite setup
-        super().__init__(
-            pos = pos, 
-            surf = self.frames[self.frame_index], 
-            groups = groups, 
-            z = LAYERS['water'])
-        
-    def animate(self, dt):
-        self.frame_index += 5 * dt
-        if self.frame_index >= len(self.frames):
-            self.frame_index = 0
-        self.image = self.frames[int(self.frame_index)]
-    
-    def update(self, dt):
-        self.animate(dt)
+        self.animation = animation
+        self.rect = frames[0].get_rect(topleft = pos)
+        self.z = LAYERS['water']
+
+    @property
+    def image(self):
+        return self.frames[self.animation.index]
 
 class WildFlower(Generic):
     def __init__(self, pos, surf, groups):
@@ -53,9 +57,9 @@ class Particle(Generic):
     def __init__(self, pos, surf, groups, z, duration=200):
         super().__init__(pos, surf, groups, z)
         # sprite that self destroys quickly; color tree completely white
-        # start time here being taken once
-        self.start_time = pygame.time.get_ticks()
+        # the game clock kills it once the duration is over
         self.duration = duration
+        game_clock.schedule(duration, self.kill)
 
         # white surface
         mask_surf = pygame.mask.from_surface(self.image)
@@ -63,26 +67,28 @@ class Particle(Generic):
         new_surf.set_colorkey((0, 0, 0))
         self.image = new_surf
 
-    def update(self, dt):
-        current_time = pygame.time.get_ticks()
-        # current time being continously updated, and at some pt we reach duration
-        if current_time - self.start_time > self.duration:
-            self.kill()
-
 class Tree(Generic):
     def __init__(self, pos, surf, groups, name, player_add):
         super().__init__(pos, surf, groups)
+        # first group is all sprites; a streamed tree is also in the group of its chunk, so it keeps the group it
+        # puts apples and particles in instead of picking one out of sprite.groups()
+        self.all_sprites = groups[0]
 
         # tree attributes
         self.health = 5
+        # the tree before it turned into a stump; a save can turn a stump back into a tree
+        self.tree_surf = surf
+        self.tree_rect = self.rect.copy()
         self.alive = True
+        # tree turns into a smaller stump, so the camera has to keep re-sorting it
+        self.dynamic = True
         # what tree looks like when destroyed
         stump_path = f'/Users/cat/Desktop/PyDewValley/graphics/stumps/{"small" if name == "Small" else "large"}.png'
-        self.stump_surf = pygame.image.load(stump_path).convert_alpha()
+        self.stump_surf = import_image(stump_path)
         
 
         # apples
-        self.apple_surf = pygame.image.load('/Users/cat/Desktop/PyDewValley/graphics/fruit/apple.png')
+        self.apple_surf = import_image('/Users/cat/Desktop/PyDewValley/graphics/fruit/apple.png')
         self.apple_pos = APPLE_POS[name]
         self.apple_sprites = pygame.sprite.Group()
         self.create_fruit()
@@ -90,7 +96,7 @@ class Tree(Generic):
         self.player_add = player_add
 
         # sounds
-        self.axe_sound = pygame.mixer.Sound('/Users/cat/Desktop/PyDewValley/audio/axe.mp3')
+        self.axe_sound = import_sound('/Users/cat/Desktop/PyDewValley/audio/axe.mp3')
 
     def damage(self):
 
@@ -106,7 +112,7 @@ class Tree(Generic):
             Particle(
                 pos=random_apple.rect.topleft,
                 surf=random_apple.image,
-                groups=self.groups()[0],
+                groups=self.all_sprites,
                 z=LAYERS['fruit'])
             self.player_add('apple')
             random_apple.kill()
@@ -115,13 +121,17 @@ class Tree(Generic):
         # when tree is dead
           if self.health <= 0:
             Particle(self.rect.topleft, self.image,
-                     self.groups()[0], LAYERS['fruit'], 300)
-            self.image = self.stump_surf
-            # if original tree exists, create tree stump that is smaller
-            self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
-            self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
-            self.alive = False
+                     self.all_sprites, LAYERS['fruit'], 300)
+            self.make_stump()
             self.player_add('wood')
+
+    def make_stump(self):
+        self.image = self.stump_surf
+        # if original tree exists, create tree stump that is smaller
+        self.rect = self.image.get_rect(midbottom=self.rect.midbottom)
+        self.hitbox = self.rect.copy().inflate(-10, -self.rect.height * 0.6)
+        update_hitbox(self)
+        self.alive = False
     
     def update(self, dt):
         # if tree is alive
@@ -135,9 +145,29 @@ class Tree(Generic):
                 # position 0 is telling us how far left of the tree we want to go
                 x = pos[0] + self.rect.left
                 y = pos[1] + self.rect.top
-                # placing each apple into apple sprites, and then into all sprites that way it will be visible
-                Generic(
-                    pos=(x, y),
-                    surf=self.apple_surf,
-                    groups=[self.apple_sprites, self.groups()[0]],
-                    z=LAYERS['fruit'])
\ No newline at end of file
+                self.add_apple((x, y))
+
+    def add_apple(self, pos):
+        # placing each apple into apple sprites, and then into all sprites that way it will be visible
+        Generic(
+            pos=pos,
+            surf=self.apple_surf,
+            groups=[self.apple_sprites, self.all_sprites],
+            z=LAYERS['fruit'])
+
+    def restore(self, health, apples=None):
+        # health and apples from a save; without apples the tree keeps the ones it has
+        self.health = health
+        if health <= 0 and self.alive:
+            self.make_stump()
+        elif health > 0 and not self.alive:
+            self.image = self.tree_surf
+            self.rect = self.tree_rect.copy()
+            self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.2, -self.rect.height * 0.75)
+            update_hitbox(self)
+            self.alive = True
+        if apples is not None:
+            for apple in self.apple_sprites.sprites():
+                apple.kill()
+            for pos in apples:
+                self.add_apple(pos)
\ No newline at end of file
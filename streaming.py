@@ -0,0 +1,222 @@
+import pygame
+from settings import *
+from sprites import Generic, Water, WaterRegion, WildFlower, Tree
+
+# size of a chunk in pixels
+CHUNK_PIXELS = CHUNK_SIZE * TILE_SIZE
+# tile layers that belong to a chunk, in drawing order
+CHUNK_TILE_LAYERS = ['HouseFloor', 'HouseFurnitureBottom', 'HouseWalls', 'HouseFurnitureTop', 'Fence', 'Water']
+
+
+def tile_bounds(tiles):
+    # left, top, right, bottom of a list of (x, y, surf) tiles, in tiles
+    left = min(x for x, _, __ in tiles)
+    top = min(y for _, y, __ in tiles)
+    right = max(x for x, _, __ in tiles) + 1
+    bottom = max(y for _, y, __ in tiles) + 1
+    return left, top, right, bottom
+
+
+def bake_tiles(bounds, tiles):
+    # one surface, only as big as the tiles inside the chunk
+    left, top, right, bottom = bounds
+    chunk_surf = pygame.Surface(((right - left) * TILE_SIZE, (bottom - top) * TILE_SIZE), pygame.SRCALPHA)
+    for x, y, surf in tiles:
+        chunk_surf.blit(surf, ((x - left) * TILE_SIZE, (y - top) * TILE_SIZE))
+    return chunk_surf
+
+
+def tree_key(rect):
+    # trees are found by where they stood before they turned into a stump, the same way the save finds them
+    return rect.left, rect.bottom
+
+
+class Chunk:
+    # what one chunk of the map is made of; this stays when the sprites of the chunk are gone
+    def __init__(self):
+        # tiles and ground are not kept here, they are read from the level data when the chunk loads
+        self.trees = []
+        self.flowers = []
+        self.collision_rects = []
+        # trees of a chunk that is not loaded; tree key -> (health, apple positions)
+        self.tree_state = {}
+        # day the chunk was unloaded; if a day went by since, its trees grew new apples
+        self.day = 0
+        # sprites of the chunk while it is loaded, None while it is not
+        self.sprites = None
+        self.tree_sprites = []
+
+
+class World:
+    # the map cut into chunks of CHUNK_SIZE tiles; with streaming only the chunks around the camera have sprites,
+    # the others are their objects and a little state; tiles and ground stay in the compiled level until a chunk loads
+    def __init__(self, level, level_data, water):
+        self.level = level
+        self.level_data = level_data
+        self.water = water
+        self.chunks = {}
+        # keys of the chunks that have sprites
+        self.loaded = set()
+
+        # every chunk of the map and of the ground exists, even if nothing else is on it
+        for cx in range(-(-level_data.width // CHUNK_SIZE)):
+            for cy in range(-(-level_data.height // CHUNK_SIZE)):
+                self.chunk((cx, cy))
+        for key in level_data.ground_chunks:
+            self.chunk(key)
+        for obj in level_data.objects('Trees'):
+            self.chunk_at(obj.x, obj.y).trees.append(obj)
+        for obj in level_data.objects('Decoration'):
+            self.chunk_at(obj.x, obj.y).flowers.append(obj)
+        for rect in level_data.collision_rects:
+            self.chunk_at(rect.x, rect.y).collision_rects.append(rect)
+
+        #collision tiles; they are never drawn, so they can all share one surface
+        self.collision_surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
+
+    def chunk(self, key):
+        if key not in self.chunks:
+            self.chunks[key] = Chunk()
+        return self.chunks[key]
+
+    def chunk_at(self, x, y):
+        # chunk of a position in pixels
+        return self.chunk((int(x // CHUNK_PIXELS), int(y // CHUNK_PIXELS)))
+
+    def chunks_in(self, rect):
+        # keys of the chunks a rect in pixels touches
+        keys = set()
+        for cx in range(rect.left // CHUNK_PIXELS, (rect.right - 1) // CHUNK_PIXELS + 1):
+            for cy in range(rect.top // CHUNK_PIXELS, (rect.bottom - 1) // CHUNK_PIXELS + 1):
+                if (cx, cy) in self.chunks:
+                    keys.add((cx, cy))
+        return keys
+
+    def load_all(self):
+        for key in self.chunks:
+            if key not in self.loaded:
+                self.load(key)
+
+    def update(self, view):
+        # load what comes close to the camera; unload only what is a whole chunk further away, so walking along
+        # the edge of a chunk does not load and unload it every frame
+        for key in self.chunks_in(view.inflate(STREAM_MARGIN * 2, STREAM_MARGIN * 2)) - self.loaded:
+            self.load(key)
+        keep = self.chunks_in(view.inflate((STREAM_MARGIN + CHUNK_PIXELS) * 2, (STREAM_MARGIN + CHUNK_PIXELS) * 2))
+        for key in self.loaded - keep:
+            self.unload(key)
+
+    def load(self, key):
+        level = self.level
+        chunk = self.chunks[key]
+        group = pygame.sprite.Group()
+        all_sprites = level.all_sprites
+        collision_sprites = level.collision_sprites
+
+        # ground; only the piece of this chunk is decoded, and it goes away with the sprite when the chunk unloads
+        ground = self.level_data.ground(key)
+        if ground is not None:
+            Generic((key[0] * CHUNK_PIXELS, key[1] * CHUNK_PIXELS), ground, [all_sprites, group], LAYERS['ground'])
+
+        # tiles of the chunk, straight from the layer arrays of the level
+        cells = (key[0] * CHUNK_SIZE, key[1] * CHUNK_SIZE, (key[0] + 1) * CHUNK_SIZE, (key[1] + 1) * CHUNK_SIZE)
+        tiles = {layer: list(self.level_data.tiles(layer, *cells)) for layer in CHUNK_TILE_LAYERS}
+
+        # house floor has to come before house furniture bottom since its drawn on top of house furniture
+        house_bottom = tiles['HouseFloor'] + tiles['HouseFurnitureBottom']
+        if house_bottom and BAKE_STATIC_LAYERS:
+            # player is always drawn on top of the house bottom, so these tiles never need their own place in the y sort
+            bounds = tile_bounds(house_bottom)
+            Generic((bounds[0] * TILE_SIZE, bounds[1] * TILE_SIZE), bake_tiles(bounds, house_bottom), [all_sprites, group], LAYERS['house bottom'])
+        else:
+            for x, y, surf in house_bottom:
+                Generic((x * TILE_SIZE, y * TILE_SIZE), surf, [all_sprites, group], LAYERS['house bottom'])
+
+        # same idea as building the house floor
+        for layer in ['HouseWalls', 'HouseFurnitureTop']:
+            for x, y, surf in tiles[layer]:
+                Generic((x * TILE_SIZE, y * TILE_SIZE), surf, [all_sprites, group])
+
+        # fence tiles
+        for x, y, surf in tiles['Fence']:
+            Generic((x * TILE_SIZE, y * TILE_SIZE), surf, [all_sprites, collision_sprites, group])
+
+        # water; one pre-tiled surface per animation frame, or one sprite per tile
+        water_tiles = tiles['Water']
+        if water_tiles and WATER_REGIONS:
+            bounds = tile_bounds(water_tiles)
+            frames = [bake_tiles(bounds, [(x, y, frame) for x, y, _ in water_tiles]) for frame in self.water.frames]
+            WaterRegion((bounds[0] * TILE_SIZE, bounds[1] * TILE_SIZE), frames, self.water, [all_sprites, group])
+        else:
+            for x, y, surf in water_tiles:
+                Water((x * TILE_SIZE, y * TILE_SIZE), self.water, [all_sprites, group])
+
+        # trees; they come back with the health and apples they had when the chunk was unloaded
+        for obj in chunk.trees:
+            tree = Tree(
+                pos=(obj.x, obj.y),
+                surf=obj.image,
+                groups=[all_sprites, collision_sprites, level.tree_sprites, group],
+                name=obj.name,
+                player_add=level.player_add)
+            saved = chunk.tree_state.get(tree_key(tree.tree_rect))
+            if saved:
+                health, apples = saved
+                # a new day started while the chunk was away, so the tree keeps the fresh apples it just grew
+                tree.restore(health, apples if chunk.day == level.day else None)
+            chunk.tree_sprites.append(tree)
+
+        # wildflowers
+        for obj in chunk.flowers:
+            WildFlower((obj.x, obj.y), obj.image, [all_sprites, collision_sprites, group])
+
+        # collision sprites is one sprite that will not exist in all sprites
+        for rect in chunk.collision_rects:
+            Generic(rect.topleft, self.collision_surf, [collision_sprites, group])
+
+        chunk.sprites = group
+        self.loaded.add(key)
+        if level.soil_layer.active_chunks is not None:
+            level.soil_layer.load_chunk(key)
+
+    def unload(self, key):
+        level = self.level
+        chunk = self.chunks[key]
+        chunk.tree_state = {}
+        for tree in chunk.tree_sprites:
+            chunk.tree_state[tree_key(tree.tree_rect)] = (tree.health, [apple.rect.topleft for apple in tree.apple_sprites])
+            for apple in tree.apple_sprites.sprites():
+                apple.kill()
+        chunk.tree_sprites = []
+        chunk.day = level.day
+
+        for sprite in chunk.sprites.sprites():
+            sprite.kill()
+        chunk.sprites = None
+        self.loaded.discard(key)
+        if level.soil_layer.active_chunks is not None:
+            level.soil_layer.unload_chunk(key)
+
+    def tree_states(self):
+        # tree key -> (health, apple positions) of every tree that was loaded at some point, for saving
+        states = {}
+        for chunk in self.chunks.values():
+            if chunk.sprites is None:
+                states.update(chunk.tree_state)
+            else:
+                for tree in chunk.tree_sprites:
+                    states[tree_key(tree.tree_rect)] = (tree.health, [apple.rect.topleft for apple in tree.apple_sprites])
+        return states
+
+    def restore_trees(self, states):
+        for chunk in self.chunks.values():
+            if chunk.sprites is None:
+                # the trees get these once the chunk loads
+                keys = [tree_key(pygame.Rect((obj.x, obj.y), obj.image.get_size())) for obj in chunk.trees]
+                chunk.tree_state = {key: states[key] for key in keys if key in states}
+                chunk.day = self.level.day
+            else:
+                for tree in chunk.tree_sprites:
+                    saved = states.get(tree_key(tree.tree_rect))
+                    if saved is not None:
+                        tree.restore(*saved)
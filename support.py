@@ -1,28 +1,72 @@
 # walk allows you to import from many folders
-from os import walk
+from os import walk, path as os_path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pygame
+from settings import SOUND_VOICES
+from sound import sound_bank
+
+# every file is loaded and converted once, after that everyone gets the same surface
+image_cache = {}
+folder_cache = {}
+# how often the cache could hand out a surface it already had, and how often it had to go to the disk
+cache_stats = {'hits': 0, 'misses': 0}
+
+def import_image(path, alpha=True):
+    key = (os_path.normpath(path), alpha)
+    if key in image_cache:
+        cache_stats['hits'] += 1
+    else:
+        cache_stats['misses'] += 1
+        # in-game pygame surface
+        image_surf = pygame.image.load(path)
+        image_cache[key] = image_surf.convert_alpha() if alpha else image_surf.convert()
+    return image_cache[key]
+
+def folder_images(path):
+    # file names and surfaces of a folder, sorted by name so animation frames stay in order
+    key = os_path.normpath(path)
+    if key in folder_cache:
+        cache_stats['hits'] += 1
+    else:
+        cache_stats['misses'] += 1
+        images = []
+        for _, __, img_files in walk(path):
+            for image in sorted(img_files):
+                full_path = path + '/' + image
+                images.append((image, import_image(full_path)))
+        folder_cache[key] = images
+    return folder_cache[key]
+
+def image_files(path):
+    # every png below a folder, for preloading
+    return [os_path.join(folder, image) for folder, _, files in walk(path) for image in sorted(files) if image.endswith('.png')]
+
+def preload_images(paths, progress=None, workers=None):
+    # png decoding happens on a thread pool, pygame lets go of the gil while it decodes;
+    # converting to the display format needs the display, so that stays on this thread and is done as each image comes in
+    todo = [path for path in paths if (os_path.normpath(path), True) not in image_cache]
+    with ThreadPoolExecutor(max_workers = workers) as pool:
+        futures = {pool.submit(pygame.image.load, path): path for path in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            image_cache[os_path.normpath(futures[future]), True] = future.result().convert_alpha()
+            # progress gets called with how many images are done and how many there are
+            if progress:
+                progress(done, len(todo))
+    return len(todo)
 
 def import_folder(path):
-    # stores all of the surfaces
-    surface_list = []
-    # the path we are getting from the parameters we are passing through
-    for _, __, img_files in walk(path):
-        for image in img_files:
-            full_path = path + '/' + image
-            # in-game pygame surface
-            image_surf = pygame.image.load(full_path).convert_alpha()
-            surface_list.append(image_surf)
-
-    return surface_list
+    # stores all of the surfaces; the list is shared, so dont change it
+    return [image_surf for _, image_surf in folder_images(path)]
 
 def import_folder_dict(path):
     surface_dict = {}
 
-    for _, __, img_files in walk(path):
-        for image in img_files:
-            full_path = path + '/' + image
-            image_surf = pygame.image.load(full_path).convert_alpha()
-            # create specific key; get index of the list which will give name of file without file ending
-            surface_dict[image.split('.')[0]] = image_surf
-        
-    return surface_dict
\ No newline at end of file
+    for image, image_surf in folder_images(path):
+        # create specific key; get index of the list which will give name of file without file ending
+        surface_dict[image.split('.')[0]] = image_surf
+
+    return surface_dict
+
+def import_sound(path, volume=None, priority=0, voices=SOUND_VOICES):
+    # every path is decoded once by the sound bank, everyone who imports it shares the same sound
+    return sound_bank.load(path, volume, priority, voices)
@@ -1,24 +1,71 @@
-import pygame
+import heapq
+
+
+class GameClock:
+    # game time in milliseconds; it moves forward by the dt of every frame instead of following the wall clock,
+    # so timers still work when the game is stepped faster than real time, and stop while the clock is not advanced
+    def __init__(self):
+        self.ticks = 0
+        # scheduler; min heap of [due time, order, callback], so a frame only looks at what is due instead of polling every timer
+        self.queue = []
+        self.count = 0
+
+    def schedule(self, delay, callback):
+        # callback gets called once the clock is delay milliseconds further; returns an entry that can be cancelled
+        self.count += 1
+        entry = [self.ticks + delay, self.count, callback]
+        heapq.heappush(self.queue, entry)
+        return entry
+
+    def cancel(self, entry):
+        # cancelled entries stay in the heap until they come up, they just do nothing then
+        entry[2] = None
+
+    def advance(self, dt):
+        self.ticks += dt * 1000
+        queue = self.queue
+        while queue and queue[0][0] <= self.ticks:
+            callback = heapq.heappop(queue)[2]
+            if callback:
+                callback()
+
+    def clear(self):
+        # a new level starts with nothing scheduled
+        self.ticks = 0
+        self.queue.clear()
+
+
+# game time stops while the shop is open; ui time (like key repeat in the menu) always runs
+game_clock = GameClock()
+ui_clock = GameClock()
 
 
 class Timer:
-    def __init__(self, duration, func=None):
+    def __init__(self, duration, func=None, clock=None):
         self.duration = duration
         self.func = func
+        self.clock = clock or game_clock
         self.start_time = 0
         self.active = False
+        self.entry = None
 
     def activate(self):
         self.active = True
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self.clock.ticks
+        if self.entry:
+            self.clock.cancel(self.entry)
+        self.entry = self.clock.schedule(self.duration, self.expire)
 
     def deactivate(self):
         self.active = False
         self.start_time = 0
+        if self.entry:
+            self.clock.cancel(self.entry)
+            self.entry = None
 
-    def update(self):
-        current_time = pygame.time.get_ticks()
-        if current_time - self.start_time >= self.duration:
-            if self.func and self.start_time != 0:
-                self.func()
-            self.deactivate()
\ No newline at end of file
+    def expire(self):
+        # called by the clock once the duration is over
+        self.entry = None
+        if self.func and self.active:
+            self.func()
+        self.deactivate()
@@ -1,20 +1,16 @@
-import pygame
-from settings import *
-
 class Transition:
-    def __init__(self, reset, player):
+    def __init__(self, reset, player, lighting):
 
         # setup
-        self.display_surface = pygame.display.get_surface()
         self.reset = reset
         self.player = player
 
-        # overlay image, create black image, then create transparency
-        self.image = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        # the screen gets darker and lighter again through the lighting, which also does the sky
+        self.lighting = lighting
         self.color = 255
         self.speed = -2
 
-    def play(self):
+    def update(self):
         # on every frame, the color is going to be a tiny bit darker
         self.color += self.speed
         if self.color <= 0:
@@ -28,7 +24,10 @@ class Transition:
             # set speed to -2 after transition
             self.speed = -2
             self.player.sleep = False
-            
-        self.image.fill((self.color, self.color, self.color))
-        self.display_surface.blit(
-            self.image, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+
+    def play(self):
+        self.update()
+        if self.player.sleep:
+            self.lighting.set_tint('transition', (self.color, self.color, self.color))
+        else:
+            self.lighting.clear_tint('transition')
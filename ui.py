@@ -0,0 +1,40 @@
+import pygame
+
+
+class TextCache:
+    # rendered text keyed by string, so a number that was already on screen is never rendered again
+    def __init__(self, font, color, limit = 512):
+        self.font = font
+        self.color = color
+        # money can take a lot of different values, so the cache starts over once it holds this many strings
+        self.limit = limit
+        self.surfs = {}
+
+    def render(self, text):
+        surf = self.surfs.get(text)
+        if surf is None:
+            if len(self.surfs) >= self.limit:
+                self.surfs.clear()
+            surf = self.font.render(text, False, self.color)
+            self.surfs[text] = surf
+        return surf
+
+
+class Panel:
+    # retained part of the ui; it is drawn into its own surface only when its state changed,
+    # and every frame that surface is blitted to the screen in one go
+    def __init__(self, rect, draw):
+        self.rect = pygame.Rect(rect)
+        self.surf = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        # draw gets called with the panel surface and the new state; positions are relative to the panel
+        self.draw = draw
+        self.state = None
+        self.built = False
+
+    def display(self, surface, state):
+        if not self.built or state != self.state:
+            self.surf.fill((0, 0, 0, 0))
+            self.draw(self.surf, state)
+            self.state = state
+            self.built = True
+        surface.blit(self.surf, self.rect)